@@ -0,0 +1,78 @@
+"""
+Password verification throughput per scrypt cost, to size nodes for login storms
+
+For each cost (log2 of scrypt's n) and worker count, runs as many
+concurrent logins as the hasher accepts for a fixed duration, and reports
+logins/sec, logins/sec per core and verification latency:
+
+    python -m benchmarks.auth_benchmark --costs 13,14,15,16 --workers 1,4 --seconds 5
+
+Set CREDENTIALS_SCRYPT_N (and CREDENTIALS_WORKERS) from the results: at the
+chosen cost, a node verifies about (logins/sec per core) x cores logins per second.
+"""
+import os
+import time
+import argparse
+import threading
+from utils.credentials import DEFAULT_P, DEFAULT_R, CredentialsBusy, PasswordHasher
+from utils.latency import RollingPercentiles
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--costs", default="13,14,15,16", help="comma-separated log2 of scrypt's n")
+    parser.add_argument("--workers", default=f"1,{os.cpu_count() or 1}", help="comma-separated hasher pool sizes")
+    parser.add_argument("-r", type=int, default=DEFAULT_R, help="scrypt block size")
+    parser.add_argument("-p", type=int, default=DEFAULT_P, help="scrypt parallelization")
+    parser.add_argument("--seconds", type=float, default=5, help="duration of each run")
+    return parser.parse_args()
+
+def run(hasher, seconds):
+    """Keep twice as many logins in flight as there are workers; returns (completed, rejected, latencies)"""
+    stored = hasher.hash("correct horse battery staple")
+    latencies = RollingPercentiles(size=100000)
+    counts = {"completed": 0, "rejected": 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def client():
+        while time.monotonic() < deadline:
+            started = time.monotonic()
+            try:
+                hasher.verify("correct horse battery staple", stored)
+            except CredentialsBusy:
+                with lock:
+                    counts["rejected"] += 1
+                continue
+            latencies.add(time.monotonic() - started)
+            with lock:
+                counts["completed"] += 1
+
+    threads = [threading.Thread(target=client) for _ in range(2 * hasher.max_workers)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return counts["completed"], counts["rejected"], latencies, time.monotonic() - started
+
+def main():
+    args = parse_arguments()
+    costs = [int(cost) for cost in args.costs.split(",")]
+    worker_counts = [int(workers) for workers in args.workers.split(",")]
+    cores = os.cpu_count() or 1
+
+    print(f"{cores} cores, r={args.r}, p={args.p}")
+    print(f"{'n':>8}{'MiB':>6}{'workers':>9}{'logins/s':>10}{'per core':>10}"
+          f"{'p50 ms':>9}{'p99 ms':>9}{'rejected':>10}")
+    for cost in costs:
+        n = 2 ** cost
+        memory = 128 * n * args.r / 2 ** 20
+        for workers in worker_counts:
+            hasher = PasswordHasher(n=n, r=args.r, p=args.p, max_workers=workers, max_pending=workers)
+            completed, rejected, latencies, elapsed = run(hasher, args.seconds)
+            rate = completed / elapsed
+            print(f"{'2^' + str(cost):>8}{memory:>6.0f}{workers:>9}{rate:>10.1f}{rate / min(workers, cores):>10.1f}"
+                  f"{latencies.percentile(50) * 1000:>9.1f}{latencies.percentile(99) * 1000:>9.1f}{rejected:>10}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Offline benchmark of GroqClient against the local mock Groq server
+
+Drives generate_dietary_goals and generate_meal_recommendations at the
+given concurrency levels and reports throughput and latency percentiles:
+
+    python -m benchmarks.groq_benchmark --tasks goals,meals,meals_stream --concurrency 1,4,16 \\
+        --requests 50 --latency lognormal:-1.5,0.5 --tokens-per-second 800 --error-rate 0.02
+
+By default an in-process mock server is started, the response cache, the
+goals memo and the recipe store are bypassed (every request is unique) and
+the client-side rate limiter is disabled; see --keep-caches, --respect-limits
+and --url.
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.mock_groq_server import add_mock_arguments, config_from_arguments, server_url, start_server
+from utils.profile import DietaryGoals, UserProfile
+
+TASKS = ("goals", "meals", "meals_stream", "meals_fanout")
+
+USER_DATA = UserProfile(
+    user_name="benchmark", age=35, sex="F", weight=65, height=170,
+    restrictions="vegetarian", allergies="peanuts", preferences="Mediterranean food",
+    goals=DietaryGoals(calories=2400, fiber=34, protein=75)
+)
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", default="goals,meals", help=f"comma-separated, among {', '.join(TASKS)}")
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=50, help="requests per task and concurrency level")
+    parser.add_argument("--url", help="benchmark an already running server instead of an in-process mock")
+    parser.add_argument("--keep-caches", action="store_true", help="leave the response cache, goals memo and recipe store on")
+    parser.add_argument("--respect-limits", action="store_true", help="keep the client-side rate limits set by GROQ_RPM and GROQ_TPM")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON lines")
+    parser.add_argument("--prometheus", action="store_true", help="also print the client's per-call telemetry")
+    add_mock_arguments(parser)
+    return parser.parse_args()
+
+def configure_environment(args, url, max_concurrency):
+    """Must run before the app modules are imported, as they read their settings at import"""
+    os.environ.setdefault("GROQ_API_KEY", "mock-key")
+    os.environ.setdefault("GROQ_MODEL", "mock-model")
+    os.environ["GROQ_API_URL"] = url
+    os.environ["HTTP_POOL_SIZE"] = str(max(max_concurrency, int(os.getenv("HTTP_POOL_SIZE", "10"))))
+    if not args.keep_caches:
+        os.environ["GROQ_CACHE_SIZE"] = "0"
+        os.environ["GOALS_MEMO_PATH"] = ":memory:"
+        os.environ["RECIPE_STORE"] = "off"
+    if not args.respect_limits:
+        os.environ["GROQ_RPM"] = "0"
+        os.environ["GROQ_TPM"] = "0"
+
+def make_workloads():
+    """One callable per task; each call gets a request number to keep requests unique"""
+    from utils.groq_client import GroqClient, AsyncGroqClient
+
+    client = GroqClient()
+    fanout_client = AsyncGroqClient()
+
+    def goals(i):
+        return client.generate_dietary_goals(18 + i % 70, "Male" if i % 2 else "Female", 40 + (i // 70) % 120, 170)
+
+    def meals(i):
+        return client.generate_meal_recommendations(USER_DATA, f"something with vegetables, variant {i}")
+
+    def meals_stream(i):
+        recipes = list(client.stream_meal_recommendations(USER_DATA, f"something quick, variant {i}"))
+        return recipes or None
+
+    def meals_fanout(i):
+        return fanout_client.generate_meal_recommendations(USER_DATA, f"something warm, variant {i}")
+
+    return {"goals": goals, "meals": meals, "meals_stream": meals_stream, "meals_fanout": meals_fanout}
+
+def run_level(workload, concurrency, requests, counter):
+    """Run `requests` calls with `concurrency` workers; returns the latencies, error count and wall time"""
+    from utils.latency import RollingPercentiles
+
+    latencies = RollingPercentiles(size=requests)
+    errors = 0
+
+    def timed_call(i):
+        started = time.monotonic()
+        try:
+            ok = workload(i) is not None
+        except Exception:
+            ok = False
+        return time.monotonic() - started, ok
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for seconds, ok in executor.map(timed_call, [next(counter) for _ in range(requests)]):
+            latencies.add(seconds)
+            errors += not ok
+    return latencies, errors, time.monotonic() - started
+
+def report(task, concurrency, requests, latencies, errors, wall_seconds, as_json):
+    result = {
+        "task": task,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(requests / wall_seconds, 2),
+        **{f"p{q}_ms": round(latencies.percentile(q) * 1000, 1) for q in (50, 95, 99)}
+    }
+    if as_json:
+        print(json.dumps(result))
+    else:
+        print(f"{task:<14}{concurrency:>6}{requests:>10}{errors:>8}{result['throughput_rps']:>12}"
+              f"{result['p50_ms']:>10}{result['p95_ms']:>10}{result['p99_ms']:>10}")
+    return result
+
+def main():
+    args = parse_arguments()
+    tasks = [task.strip() for task in args.tasks.split(",") if task.strip()]
+    unknown = set(tasks) - set(TASKS)
+    if unknown:
+        sys.exit(f"Unknown tasks: {', '.join(sorted(unknown))}")
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    server = None
+    url = args.url
+    if url is None:
+        server = start_server(config_from_arguments(args))
+        url = server_url(server)
+    configure_environment(args, url, max(levels))
+
+    # The client reports failures through st.error, which has no page to show on here
+    import streamlit.runtime.scriptrunner_utils.script_run_context
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith("streamlit"):
+            logging.getLogger(name).setLevel(logging.ERROR)
+    workloads = make_workloads()
+
+    if not args.json:
+        print(f"Benchmarking {url}")
+        print(f"{'task':<14}{'conc.':>6}{'requests':>10}{'errors':>8}{'req/s':>12}"
+              f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+
+    counter = itertools.count()
+    for task in tasks:
+        for concurrency in levels:
+            latencies, errors, wall_seconds = run_level(workloads[task], concurrency, args.requests, counter)
+            report(task, concurrency, args.requests, latencies, errors, wall_seconds, args.json)
+
+    if args.prometheus:
+        from utils.telemetry import get_telemetry
+        print(get_telemetry().render_prometheus())
+
+    if server is not None:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
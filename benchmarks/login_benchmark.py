@@ -0,0 +1,119 @@
+"""
+Login lookup latency at growing table sizes, on a real Snowflake account
+
+For each size, builds a scratch copy of the users table filled with
+synthetic users, optionally adds search optimization on USER_NAME, then
+times random logins with the previous query (SELECT * and a pandas
+DataFrame) and with the lookup authenticate_user makes, LOGIN_QUERY
+(projection, plain dict, equality on USER_NAME only):
+
+    SNOWFLAKE_CONNECTION_NAME=dev python -m benchmarks.login_benchmark --schema SCRATCH.PUBLIC \\
+        --sizes 10000,1000000,10000000 --lookups 50
+
+The result cache is disabled for the session so every lookup is executed.
+"""
+import sys
+import time
+import random
+import argparse
+from utils.latency import RollingPercentiles
+
+PREVIOUS_QUERY = "SELECT * FROM {table} WHERE USER_NAME = ? AND USER_PASSWORD = ?"
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--schema", required=True, help="database.schema where the scratch tables are created")
+    parser.add_argument("--sizes", default="10000,1000000,10000000", help="comma-separated user counts")
+    parser.add_argument("--lookups", type=int, default=50, help="timed logins per size and query")
+    parser.add_argument("--no-search-optimization", action="store_true", help="benchmark the plain table")
+    parser.add_argument("--keep-tables", action="store_true", help="do not drop the scratch tables")
+    return parser.parse_args()
+
+def create_table(session, table, size, search_optimization):
+    session.sql(f"""
+        CREATE OR REPLACE TABLE {table} AS
+        SELECT
+            'user_' || SEQ8() AS USER_NAME,
+            'password_' || SEQ8() AS USER_PASSWORD,
+            UNIFORM(18, 80, RANDOM()) AS AGE,
+            IFF(UNIFORM(0, 1, RANDOM()) = 0, 'M', 'F') AS SEX,
+            UNIFORM(45, 120, RANDOM()) AS WEIGHT,
+            UNIFORM(150, 200, RANDOM()) AS HEIGHT,
+            'None' AS RESTRICTIONS,
+            'None' AS ALLERGIES,
+            'None' AS PREFERENCES,
+            2400 AS GOAL_CALORIES,
+            34 AS GOAL_FIBER,
+            75 AS GOAL_PROTEIN
+        FROM TABLE(GENERATOR(ROWCOUNT => {size}))
+    """).collect()
+    if search_optimization:
+        session.sql(f"ALTER TABLE {table} ADD SEARCH OPTIMIZATION ON EQUALITY(USER_NAME)").collect()
+        wait_for_search_optimization(session, table)
+
+def wait_for_search_optimization(session, table, timeout=1800):
+    """Search optimization builds in the background; lookups only benefit once it is complete"""
+    database_schema, _, name = table.rpartition(".")
+    started = time.monotonic()
+    while time.monotonic() - started < timeout:
+        rows = session.sql(f"SHOW TABLES LIKE '{name}' IN SCHEMA {database_schema}").collect()
+        progress = rows[0].as_dict().get("search_optimization_progress") if rows else None
+        if progress is not None and float(progress) >= 100:
+            return
+        time.sleep(10)
+    print(f"Search optimization of {table} still building after {timeout} s", file=sys.stderr)
+
+def time_logins(session, size, lookups, login):
+    latencies = RollingPercentiles(size=lookups)
+    for _ in range(lookups):
+        i = random.randrange(size)
+        started = time.monotonic()
+        user = login(session, f"user_{i}", f"password_{i}")
+        latencies.add(time.monotonic() - started)
+        if user is None:
+            raise RuntimeError(f"user_{i} not found")
+    return latencies
+
+def previous_login(table):
+    import pandas as pd
+
+    def login(session, username, password):
+        result = session.sql(PREVIOUS_QUERY.format(table=table), params=[username, password]).collect()
+        return pd.DataFrame(result).iloc[0] if result else None
+    return login
+
+def current_login(table):
+    from utils.database import LOGIN_QUERY, PROFILE_COLUMNS
+
+    def login(session, username, password):
+        # Only the lookup is timed here; see benchmarks/auth_benchmark.py for password verification
+        query = LOGIN_QUERY.format(columns=", ".join(PROFILE_COLUMNS), table=table)
+        result = session.sql(query, params=[username]).collect()
+        return result[0].as_dict() if result else None
+    return login
+
+def main():
+    args = parse_arguments()
+    sizes = [int(size) for size in args.sizes.split(",")]
+    search_optimization = not args.no_search_optimization
+
+    from utils.snowflake_session import get_session_manager
+
+    print(f"{'users':>10}  {'query':<10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    with get_session_manager().session() as session:
+        session.sql("ALTER SESSION SET USE_CACHED_RESULT = FALSE").collect()
+        for size in sizes:
+            table = f"{args.schema}.USERS_LOGIN_BENCHMARK_{size}"
+            create_table(session, table, size, search_optimization)
+            try:
+                for name, login in (("previous", previous_login(table)), ("current", current_login(table))):
+                    latencies = time_logins(session, size, args.lookups, login)
+                    print(f"{size:>10}  {name:<10}" + "".join(
+                        f"{latencies.percentile(q) * 1000:>10.1f}" for q in (50, 95, 99)
+                    ))
+            finally:
+                if not args.keep_tables:
+                    session.sql(f"DROP TABLE IF EXISTS {table}").collect()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+Local stand-in for the Groq OpenAI-compatible chat completions API
+
+Answers goals, single-recipe and three-recipe prompts with canned JSON,
+with configurable latency, token rate, error injection and SSE streaming.
+Point the app at it with GROQ_API_URL:
+
+    python -m benchmarks.mock_groq_server --port 8000 --latency lognormal:-1.5,0.5 --tokens-per-second 500
+    GROQ_API_URL=http://127.0.0.1:8000/openai/v1/chat/completions streamlit run streamlit_app.py
+"""
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from dataclasses import dataclass
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, List
+
+GOALS = {
+    "explanation": "Based on a moderate activity level and standard nutritional guidelines.",
+    "calories": 2400,
+    "fiber": 34,
+    "protein": 75
+}
+
+RECIPES = [
+    {
+        "title": "Chickpea and Spinach Stew",
+        "instructions": "1. Sauté the onion and garlic in olive oil. 2. Add the chickpeas, tomatoes and spices. "
+                        "3. Simmer for 15 minutes, stir in the spinach and serve.",
+        "time": 25,
+        "ingredients": ["240 g canned chickpeas", "1 onion", "2 cloves garlic", "200 g crushed tomatoes",
+                        "100 g spinach", "1 tbsp olive oil", "1 tsp cumin"],
+        "calories": 780,
+        "fiber": 12,
+        "protein": 25
+    },
+    {
+        "title": "Quinoa Salad with Feta",
+        "instructions": "1. Cook the quinoa and let it cool. 2. Dice the cucumber and tomatoes. "
+                        "3. Toss everything with the feta, lemon juice and olive oil.",
+        "time": 20,
+        "ingredients": ["90 g quinoa", "1 cucumber", "150 g cherry tomatoes", "60 g feta",
+                        "1 lemon", "1 tbsp olive oil"],
+        "calories": 790,
+        "fiber": 11,
+        "protein": 24
+    },
+    {
+        "title": "Salmon with Roasted Vegetables",
+        "instructions": "1. Roast the vegetables at 200°C for 15 minutes. 2. Add the salmon to the tray. "
+                        "3. Roast 12 more minutes and serve with lemon.",
+        "time": 35,
+        "ingredients": ["150 g salmon fillet", "1 zucchini", "1 red bell pepper", "150 g broccoli",
+                        "1 tbsp olive oil", "1/2 lemon"],
+        "calories": 800,
+        "fiber": 12,
+        "protein": 26
+    }
+]
+
+@dataclass
+class MockConfig:
+    """How the mock server behaves; see parse_latency for the latency syntax"""
+    latency: str = "fixed:0.2"
+    tokens_per_second: float = 0
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    chunk_tokens: int = 4
+    seed: int = None
+
+def parse_latency(spec: str):
+    """
+    Build a sampler of time-to-first-byte seconds from a spec such as
+    "fixed:0.2", "uniform:0.1,0.5", "normal:0.3,0.05" or "lognormal:-1.5,0.5"
+    (mu and sigma of the underlying normal, in log-seconds)
+    """
+    kind, _, params = spec.partition(":")
+    values = [float(value) for value in params.split(",") if value]
+    if kind == "fixed":
+        return lambda rng: values[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "normal":
+        return lambda rng: max(rng.gauss(values[0], values[1]), 0.0)
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(values[0], values[1])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+def _estimate_tokens(text: str) -> int:
+    return max(len(text) // 4, 1)
+
+def completion_for(payload: Dict) -> str:
+    """Canned answer matching what the prompt asks for"""
+    prompt = " ".join(message.get("content") or "" for message in payload.get("messages", [])).lower()
+    if "dietary goals" in prompt and "recipe" not in prompt:
+        if "briefly explain" in prompt:
+            return GOALS["explanation"]
+        return json.dumps(GOALS)
+    if "generate 1 recipe" in prompt:
+        return json.dumps(RECIPES[len(prompt) % len(RECIPES)])
+    return json.dumps({f"recipe {i + 1}": recipe for i, recipe in enumerate(RECIPES)})
+
+def _chunks(text: str, chunk_tokens: int) -> List[str]:
+    size = max(chunk_tokens * 4, 1)
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+class MockGroqHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config: MockConfig = MockConfig()
+    sample_latency = staticmethod(parse_latency(MockConfig.latency))
+    rng = random.Random()
+    rng_lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _sample(self):
+        with self.rng_lock:
+            return self.sample_latency(self.rng), self.rng.random()
+
+    def _send_json(self, status: int, body: Dict, headers: Dict = None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": {"message": "invalid JSON"}})
+            return
+
+        latency, roll = self._sample()
+        time.sleep(latency)
+
+        config = self.config
+        if roll < config.rate_limit_rate:
+            self._send_json(429, {"error": {"message": "rate limit reached"}}, {"retry-after": "1"})
+            return
+        if roll < config.rate_limit_rate + config.error_rate:
+            self._send_json(503, {"error": {"message": "service unavailable"}})
+            return
+
+        content = completion_for(payload)
+        usage = {
+            "prompt_tokens": sum(_estimate_tokens(message.get("content") or "") for message in payload.get("messages", [])),
+            "completion_tokens": _estimate_tokens(content)
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        seconds_per_token = 1 / config.tokens_per_second if config.tokens_per_second else 0
+        model = payload.get("model") or "mock"
+
+        if payload.get("stream"):
+            self._stream(content, usage, model, seconds_per_token)
+            return
+
+        time.sleep(usage["completion_tokens"] * seconds_per_token)
+        self._send_json(200, {
+            "id": f"chatcmpl-mock-{int(time.time() * 1000)}",
+            "object": "chat.completion",
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": usage
+        }, {"x-ratelimit-remaining-requests": "1000", "x-ratelimit-remaining-tokens": "1000000"})
+
+    def _stream(self, content: str, usage: Dict, model: str, seconds_per_token: float):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        def send(data):
+            self.wfile.write(f"data: {data}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        for chunk in _chunks(content, self.config.chunk_tokens):
+            time.sleep(_estimate_tokens(chunk) * seconds_per_token)
+            send(json.dumps({"object": "chat.completion.chunk", "model": model,
+                             "choices": [{"index": 0, "delta": {"content": chunk}}]}))
+        # Like Groq, usage comes on a last chunk under x_groq
+        send(json.dumps({"object": "chat.completion.chunk", "model": model,
+                         "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                         "x_groq": {"usage": usage}}))
+        send("[DONE]")
+        self.close_connection = True
+
+class MockGroqServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients drop keep-alive connections, e.g. after a retried error response
+        if isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            return
+        super().handle_error(request, client_address)
+
+def start_server(config: MockConfig, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Start the mock server on a background thread; port 0 picks a free port"""
+    handler = type("ConfiguredMockGroqHandler", (MockGroqHandler,), {
+        "config": config,
+        "sample_latency": staticmethod(parse_latency(config.latency)),
+        "rng": random.Random(config.seed),
+        "rng_lock": threading.Lock()
+    })
+    server = MockGroqServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def server_url(server: ThreadingHTTPServer) -> str:
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}/openai/v1/chat/completions"
+
+def add_mock_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency", default=MockConfig.latency,
+                        help="time to first byte distribution, e.g. fixed:0.2, uniform:0.1,0.5, lognormal:-1.5,0.5")
+    parser.add_argument("--tokens-per-second", type=float, default=MockConfig.tokens_per_second,
+                        help="completion token rate, 0 for instant")
+    parser.add_argument("--error-rate", type=float, default=MockConfig.error_rate, help="share of 503 responses")
+    parser.add_argument("--rate-limit-rate", type=float, default=MockConfig.rate_limit_rate,
+                        help="share of 429 responses")
+    parser.add_argument("--seed", type=int, default=None)
+
+def config_from_arguments(args) -> MockConfig:
+    return MockConfig(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        seed=args.seed
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    server = start_server(config_from_arguments(args), args.host, args.port)
+    print(f"Mock Groq API listening on {server_url(server)}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Query latency of the nutrition index over synthetic recipe corpora
+
+For each corpus size, indexes random recipes (nutrition figures around
+typical per-meal values, ingredients drawn from a fixed pool, a few
+restriction groups) and times "top k within ±tolerance, excluding
+allergens" queries for random per-meal targets:
+
+    python -m benchmarks.recipe_index_benchmark --sizes 1000,10000,100000 --queries 2000
+"""
+import time
+import random
+import argparse
+from utils.latency import RollingPercentiles
+from utils.nutrition_index import NutritionIndex
+from utils.recipes import Recipe
+
+INGREDIENTS = [
+    "chickpeas", "spinach", "tomatoes", "onion", "garlic", "olive oil", "rice", "quinoa", "lentils", "tofu",
+    "salmon", "chicken breast", "eggs", "feta", "milk", "butter", "pasta", "bread", "peanuts", "almonds",
+    "shrimp", "broccoli", "carrots", "sweet potatoes", "black beans", "avocado", "yogurt", "oats", "bell pepper",
+    "mushrooms", "zucchini", "sesame seeds", "soy sauce", "coconut milk", "cod", "kale", "barley", "corn"
+]
+GROUPS = ["", "vegetarian", "vegan", "gluten free"]
+ALLERGIES = ["", "peanuts", "dairy", "shellfish, gluten", "nuts, eggs"]
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,100000", help="comma-separated corpus sizes")
+    parser.add_argument("--queries", type=int, default=2000, help="timed queries per size")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative deviation")
+    parser.add_argument("-k", type=int, default=3, help="recipes per query")
+    return parser.parse_args()
+
+def random_recipe(rng, i):
+    return Recipe(
+        title=f"Recipe {i}",
+        ingredients=[f"{rng.randint(1, 500)} g {name}" for name in rng.sample(INGREDIENTS, rng.randint(4, 9))],
+        calories=rng.gauss(650, 200),
+        fiber=rng.gauss(10, 4),
+        protein=rng.gauss(28, 10)
+    )
+
+def main():
+    args = parse_arguments()
+    rng = random.Random(0)
+
+    print(f"{'recipes':>10}{'build s':>9}{'p50 us':>9}{'p95 us':>9}{'p99 us':>9}{'found/query':>13}")
+    for size in (int(size) for size in args.sizes.split(",")):
+        started = time.monotonic()
+        index = NutritionIndex()
+        for i in range(size):
+            index.add(random_recipe(rng, i), rng.choice(GROUPS))
+        # The first query builds the sorted snapshot, count it in the build time
+        index.query(650, 10, 28)
+        build = time.monotonic() - started
+
+        latencies = RollingPercentiles(size=args.queries)
+        found = 0
+        for _ in range(args.queries):
+            calories = rng.uniform(450, 900)
+            query = dict(calories=calories, fiber=calories / 60, protein=calories / 25, tolerance=args.tolerance,
+                         k=args.k, group=rng.choice(GROUPS), allergies=rng.choice(ALLERGIES))
+            started = time.perf_counter()
+            found += len(index.query(**query))
+            latencies.add(time.perf_counter() - started)
+
+        print(f"{size:>10}{build:>9.2f}" + "".join(
+            f"{latencies.percentile(q) * 1e6:>9.0f}" for q in (50, 95, 99)
+        ) + f"{found / args.queries:>13.2f}")
+
+if __name__ == "__main__":
+    main()
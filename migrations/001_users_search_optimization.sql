@@ -0,0 +1,10 @@
+-- Login looks users up by USER_NAME (see LOGIN_QUERY in utils/database.py).
+-- Search optimization keeps a search access path for equality predicates on USER_NAME,
+-- so the lookup prunes micro-partitions instead of scanning the whole table as it grows.
+-- Requires Enterprise Edition or higher; building the access path runs in the background
+-- (follow SEARCH_OPTIMIZATION_PROGRESS in SHOW TABLES).
+ALTER TABLE HACKATON.USERS_DATA.USERS ADD SEARCH OPTIMIZATION ON EQUALITY(USER_NAME);
+
+-- Alternative on Standard Edition: cluster the table on USER_NAME so automatic clustering
+-- keeps names co-located and partition pruning works for the lookup.
+-- ALTER TABLE HACKATON.USERS_DATA.USERS CLUSTER BY (USER_NAME);
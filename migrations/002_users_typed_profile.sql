@@ -0,0 +1,29 @@
+-- Store the dietary profile as typed columns instead of free text, so the app reads
+-- ready-to-use values (see utils/profile.py) instead of parsing them on every view:
+-- DIETARY_RESTRICTIONS ("Restrictions: ...\nAllergies: ...\nPreferences: ...") is split into
+-- RESTRICTIONS, ALLERGIES and PREFERENCES, and the DIETARY_GOALS JSON into GOAL_* numbers.
+ALTER TABLE HACKATON.USERS_DATA.USERS ADD COLUMN
+    RESTRICTIONS VARCHAR,
+    ALLERGIES VARCHAR,
+    PREFERENCES VARCHAR,
+    GOAL_CALORIES NUMBER(6, 0),
+    GOAL_FIBER NUMBER(5, 0),
+    GOAL_PROTEIN NUMBER(5, 0);
+
+-- Backfill existing users. Bulk-imported users have no "Restrictions:" label; their whole
+-- value goes to RESTRICTIONS. Goals that are not valid JSON stay NULL (shown as not set).
+UPDATE HACKATON.USERS_DATA.USERS SET
+    RESTRICTIONS = IFF(
+        CONTAINS(DIETARY_RESTRICTIONS, 'Restrictions:'),
+        TRIM(REGEXP_SUBSTR(DIETARY_RESTRICTIONS, 'Restrictions:([^\\n]*)', 1, 1, 'e', 1)),
+        TRIM(DIETARY_RESTRICTIONS)
+    ),
+    ALLERGIES = COALESCE(TRIM(REGEXP_SUBSTR(DIETARY_RESTRICTIONS, 'Allergies:([^\\n]*)', 1, 1, 'e', 1)), ''),
+    PREFERENCES = COALESCE(TRIM(REGEXP_SUBSTR(DIETARY_RESTRICTIONS, 'Preferences:([^\\n]*)', 1, 1, 'e', 1)), ''),
+    GOAL_CALORIES = TRY_PARSE_JSON(DIETARY_GOALS):calories::NUMBER(6, 0),
+    GOAL_FIBER = TRY_PARSE_JSON(DIETARY_GOALS):fiber::NUMBER(5, 0),
+    GOAL_PROTEIN = TRY_PARSE_JSON(DIETARY_GOALS):protein::NUMBER(5, 0)
+WHERE GOAL_CALORIES IS NULL AND RESTRICTIONS IS NULL;
+
+-- Once no instance of the previous app version is running, drop the free-text columns:
+-- ALTER TABLE HACKATON.USERS_DATA.USERS DROP COLUMN DIETARY_RESTRICTIONS, DIETARY_GOALS;
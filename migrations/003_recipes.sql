@@ -0,0 +1,16 @@
+-- Generated recipes kept for retrieval, used with RECIPE_STORE=snowflake (see utils/recipe_store.py).
+-- DIET_KEY is "<restrictions>|<allergies>" of the profile the recipe was generated for (see diet_key):
+-- recipes are only deduplicated among and served to profiles with exactly the same key.
+-- TITLE_KEY and INGREDIENTS_KEY are the normalized title and ingredient set used for deduplication.
+CREATE TABLE IF NOT EXISTS HACKATON.USERS_DATA.RECIPES (
+    DIET_KEY VARCHAR NOT NULL,
+    TITLE VARCHAR NOT NULL,
+    TITLE_KEY VARCHAR NOT NULL,
+    INGREDIENTS_KEY VARCHAR NOT NULL,
+    RECIPE_JSON VARCHAR NOT NULL,
+    CALORIES FLOAT NOT NULL,
+    FIBER FLOAT,
+    PROTEIN FLOAT,
+    CREATED_AT FLOAT NOT NULL
+)
+CLUSTER BY (DIET_KEY, CALORIES);
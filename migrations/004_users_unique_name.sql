@@ -0,0 +1,39 @@
+-- USER_NAME identifies a user: the profile cache, the session and password upgrades are keyed by it.
+-- Snowflake does not enforce UNIQUE constraints, so the app keeps names unique itself: registration
+-- rejects taken names and writes new users with a MERGE on USER_NAME (see UniqueWriteBuffer in
+-- utils/write_buffer.py). Bulk imports (write_pandas) leave out names that are taken, repeated or contain '#'
+-- (see import_users in utils/batch_import.py).
+
+-- Earlier versions allowed several accounts with the same name, told apart by their password.
+-- List them before renaming:
+SELECT USER_NAME, COUNT(*) AS ACCOUNTS
+FROM HACKATON.USERS_DATA.USERS
+GROUP BY USER_NAME
+HAVING COUNT(*) > 1;
+
+-- Keep the name on one of them and rename the others "<name>#2", "<name>#3", ... Their owners still
+-- log in with "<name>" and their password: USERS_RENAMED maps each login name to the renamed accounts,
+-- looked up only when no account named exactly "<name>" has the password (see RENAMED_TABLE in
+-- utils/database.py), so logins stay equality lookups. New usernames cannot contain '#'.
+CREATE TABLE IF NOT EXISTS HACKATON.USERS_DATA.USERS_RENAMED (
+    LOGIN_NAME VARCHAR NOT NULL,
+    USER_NAME VARCHAR NOT NULL
+);
+
+INSERT INTO HACKATON.USERS_DATA.USERS_RENAMED (LOGIN_NAME, USER_NAME)
+SELECT USER_NAME, USER_NAME || '#' || ROW_NUMBER() OVER (PARTITION BY USER_NAME ORDER BY USER_PASSWORD)
+FROM HACKATON.USERS_DATA.USERS
+QUALIFY ROW_NUMBER() OVER (PARTITION BY USER_NAME ORDER BY USER_PASSWORD) > 1;
+
+INSERT OVERWRITE INTO HACKATON.USERS_DATA.USERS
+SELECT * REPLACE (
+    IFF(
+        ROW_NUMBER() OVER (PARTITION BY USER_NAME ORDER BY USER_PASSWORD) = 1,
+        USER_NAME,
+        USER_NAME || '#' || ROW_NUMBER() OVER (PARTITION BY USER_NAME ORDER BY USER_PASSWORD)
+    ) AS USER_NAME
+)
+FROM HACKATON.USERS_DATA.USERS;
+
+-- Informational only (not enforced), documents the key for tools and the optimizer
+ALTER TABLE HACKATON.USERS_DATA.USERS ADD CONSTRAINT USERS_USER_NAME_UNIQUE UNIQUE (USER_NAME);
@@ -8,6 +8,7 @@ from views.meal_preparation import meal_preparation_view
 from views.recipe_choice import recipe_choice_view
 from views.ordering import ordering_view
 from utils.session_manager import initialize_session_state
+from utils.snowflake_session import get_session_manager
 
 # ✅ First Streamlit command — set config early
 st.set_page_config(
@@ -120,6 +121,9 @@ def apply_custom_theme():
 # ✅ Apply theme once at app start
 apply_custom_theme()
 
+# ✅ Get the Snowflake session ready before the first login needs it
+get_session_manager()
+
 def main():
     """Main application logic"""
     initialize_session_state()
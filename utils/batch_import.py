@@ -0,0 +1,143 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+import pandas as pd
+from utils.credentials import get_password_hasher
+from utils.goals_engine import get_goals_engine
+from utils.goals_memo import get_goals_memo, profile_bucket
+from utils.json_repair import parse_json_object
+from utils.profile import GOAL_COLUMNS, DietaryGoals
+from utils.rate_limiter import BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+PROFILE_COLUMNS = ["AGE", "SEX", "WEIGHT", "HEIGHT"]
+REQUIRED_COLUMNS = ["USER_NAME", "USER_PASSWORD"] + PROFILE_COLUMNS
+PREFERENCE_COLUMNS = ["RESTRICTIONS", "ALLERGIES", "PREFERENCES"]
+
+def _goals_frame(goals, index) -> pd.DataFrame:
+    """GOAL_* columns from DietaryGoals (or None) per profile, nullable integers"""
+    return pd.DataFrame({
+        column: pd.array([None if goal is None else getattr(goal, attribute) for goal in goals], dtype="Int64")
+        for column, attribute in zip(GOAL_COLUMNS, ("calories", "fiber", "protein"))
+    }, index=index)
+
+def _local_goals(profiles: pd.DataFrame, engine) -> pd.DataFrame:
+    goals = engine.compute_many(profiles[PROFILE_COLUMNS])
+    return pd.DataFrame({
+        "GOAL_CALORIES": goals["CALORIES"].astype("Int64"),
+        "GOAL_FIBER": goals["FIBER"].astype("Int64"),
+        "GOAL_PROTEIN": goals["PROTEIN"].astype("Int64")
+    }).set_axis(profiles.index)
+
+def _llm_goals(profiles: pd.DataFrame, batch_size: int, max_workers: int) -> pd.DataFrame:
+    # Imported here as the client module is not needed for the local fast path
+    from utils.groq_client import GroqClient
+
+    # Profiles in the same bucket share one answer, and memoized buckets need no request
+    buckets = [profile_bucket(*row) for row in profiles[PROFILE_COLUMNS].itertuples(index=False)]
+    memo = get_goals_memo()
+    responses = {}
+    for bucket in dict.fromkeys(buckets):
+        memoized = memo.get(*bucket)
+        if memoized:
+            responses[bucket] = memoized
+
+    missing = [bucket for bucket in dict.fromkeys(buckets) if bucket not in responses]
+    batches = [missing[i:i + batch_size] for i in range(0, len(missing), batch_size)]
+    logger.info(f"[IMPORT] {len(buckets)} profiles, {len(responses)} memoized buckets, {len(batches)} requests")
+
+    if batches:
+        groq_client = GroqClient()
+        # Concurrent batches still queue in the rate limiter, behind interactive requests
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(lambda batch: groq_client.generate_dietary_goals_batch(batch, priority=BACKGROUND),
+                                   batches)
+            for batch, contents in zip(batches, results):
+                for bucket, content in zip(batch, contents):
+                    if content is not None:
+                        responses[bucket] = content
+
+    goals = {bucket: DietaryGoals.from_mapping(parse_json_object(content)) for bucket, content in responses.items()}
+    return _goals_frame([goals.get(bucket) for bucket in buckets], profiles.index)
+
+def generate_goals_batch(profiles: pd.DataFrame, engine_name: Optional[str] = None,
+                         batch_size: int = 25, max_workers: int = 4) -> pd.DataFrame:
+    """
+    Generate dietary goals for many profiles
+
+    The local goals engine computes them in one vectorized pass; with the
+    "llm" engine, profiles are packed `batch_size` per request and the
+    requests run `max_workers` at a time.
+
+    Args:
+        profiles (pd.DataFrame): AGE, SEX, WEIGHT and HEIGHT columns
+        engine_name (str): goals engine, GOALS_ENGINE by default
+
+    Returns:
+        pd.DataFrame: GOAL_CALORIES, GOAL_FIBER and GOAL_PROTEIN columns aligned with
+            `profiles`, missing where generation failed
+    """
+    engine = get_goals_engine(engine_name)
+    if engine is not None:
+        return _local_goals(profiles, engine)
+    return _llm_goals(profiles, batch_size, max_workers)
+
+def _rejected_names(users: pd.DataFrame) -> pd.Series:
+    """
+    Why each row's USER_NAME cannot be imported, or None: missing, contains
+    '#' (reserved, see migrations/004_users_unique_name.sql), repeats an
+    earlier row of the frame, or is already taken in USERS
+    """
+    from utils.database import existing_user_names
+
+    names = users["USER_NAME"].fillna("").astype(str).str.strip()
+    reasons = pd.Series(None, index=users.index, dtype=object)
+    reasons[names == ""] = "missing username"
+    reasons[reasons.isna() & names.str.contains("#", regex=False)] = "username contains '#'"
+    reasons[reasons.isna() & names.duplicated(keep="first")] = "username repeated in the import"
+    candidates = names[reasons.isna()]
+    taken = existing_user_names(candidates.tolist()) if len(candidates) else set()
+    reasons[reasons.isna() & names.isin(taken)] = "username already taken"
+    return reasons
+
+def import_users(users: pd.DataFrame, engine_name: Optional[str] = None,
+                 batch_size: int = 25, max_workers: int = 4) -> Optional[Dict]:
+    """
+    Generate dietary goals for a list of users and bulk-write them to HACKATON.USERS_DATA.USERS
+
+    Args:
+        users (pd.DataFrame): USER_NAME, USER_PASSWORD, AGE, SEX, WEIGHT, HEIGHT
+            and optionally RESTRICTIONS, ALLERGIES and PREFERENCES columns
+
+    Returns:
+        Dict: number of users written, the rows whose goals could not be generated and
+            the rows rejected for their username, with a REASON column (neither written,
+            both without their passwords), or None if the write failed
+    """
+    from utils.database import bulk_insert_users
+
+    missing_columns = [column for column in REQUIRED_COLUMNS if column not in users.columns]
+    if missing_columns:
+        raise ValueError(f"Missing columns: {', '.join(missing_columns)}")
+
+    # Checked before generating goals, so rejected rows cost nothing
+    reasons = _rejected_names(users)
+    rejected = users[reasons.notna()].drop(columns="USER_PASSWORD").assign(REASON=reasons[reasons.notna()])
+    if len(rejected):
+        logger.warning(f"Not importing {len(rejected)} users: {rejected['REASON'].value_counts().to_dict()}")
+
+    users = users[reasons.isna()].copy()
+    users["USER_NAME"] = users["USER_NAME"].astype(str).str.strip()
+    for column in PREFERENCE_COLUMNS:
+        users[column] = users[column].fillna("") if column in users.columns else ""
+    users[GOAL_COLUMNS] = generate_goals_batch(users, engine_name, batch_size, max_workers)
+
+    generated = users["GOAL_CALORIES"].notna()
+    failed = users[~generated].drop(columns="USER_PASSWORD")
+    ready = users[generated].copy()
+    ready["USER_PASSWORD"] = get_password_hasher().hash_many(ready["USER_PASSWORD"].astype(str).tolist())
+    written = bulk_insert_users(ready) if len(ready) else 0
+    if written is None:
+        return None
+    return {"written": written, "failed": failed, "rejected": rejected}
@@ -0,0 +1,129 @@
+import os
+import hmac
+import base64
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+SCHEME = "scrypt"
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+# scrypt cost: CPU and memory grow linearly with n (128 * n * r bytes, 16 MiB at the defaults).
+# Measure with benchmarks/auth_benchmark.py before raising it.
+DEFAULT_N = 2 ** 14
+DEFAULT_R = 8
+DEFAULT_P = 1
+
+class CredentialsBusy(Exception):
+    """Raised when too many verifications are already queued, e.g. during a login storm"""
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii").rstrip("=")
+
+def _b64decode(text: str) -> bytes:
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int, length: int = KEY_BYTES) -> bytes:
+    # OpenSSL refuses to use more than maxmem, 32 MiB by default
+    maxmem = 128 * r * (n + p + 2) + 1024 * 1024
+    return hashlib.scrypt(password.encode("utf-8"), salt=salt, n=n, r=r, p=p, maxmem=maxmem, dklen=length)
+
+def is_hashed(stored: Optional[str]) -> bool:
+    """Whether a USER_PASSWORD value is a hash, as opposed to a legacy plain-text password"""
+    return bool(stored) and stored.startswith(SCHEME + "$")
+
+class PasswordHasher:
+    """
+    Salted scrypt hashes, encoded as "scrypt$n$r$p$salt$hash" so the cost
+    can be raised without invalidating stored passwords.
+
+    Hashing runs in a pool of `max_workers` threads (hashlib releases the
+    GIL while hashing), which bounds the CPU and memory spent on logins;
+    at most `max_pending` verifications wait for a worker, further ones
+    raise CredentialsBusy instead of queueing without limit.
+    """
+
+    def __init__(self, n: int = DEFAULT_N, r: int = DEFAULT_R, p: int = DEFAULT_P,
+                 max_workers: int = 4, max_pending: int = 64):
+        self.n = n
+        self.r = r
+        self.p = p
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="credentials")
+        self._pending = threading.BoundedSemaphore(max_workers + max_pending)
+        self._dummy_hash = None
+
+    def _hash(self, password: str) -> str:
+        salt = os.urandom(SALT_BYTES)
+        key = _scrypt(password, salt, self.n, self.r, self.p)
+        return f"{SCHEME}${self.n}${self.r}${self.p}${_b64encode(salt)}${_b64encode(key)}"
+
+    def _verify(self, password: str, stored: Optional[str]) -> Tuple[bool, bool]:
+        if not is_hashed(stored):
+            # Legacy plain-text password, to be replaced by a hash once it matched
+            matches = stored is not None and hmac.compare_digest(password.encode("utf-8"), stored.encode("utf-8"))
+            return matches, matches
+        try:
+            _, n, r, p, salt, key = stored.split("$")
+            n, r, p, salt, key = int(n), int(r), int(p), _b64decode(salt), _b64decode(key)
+        except ValueError:
+            logger.error("Malformed password hash")
+            return False, False
+        matches = hmac.compare_digest(_scrypt(password, salt, n, r, p, len(key)), key)
+        return matches, matches and (n, r, p) != (self.n, self.r, self.p)
+
+    def _verify_unknown(self, password: str, _stored: None) -> Tuple[bool, bool]:
+        if self._dummy_hash is None:
+            self._dummy_hash = self._hash(_b64encode(os.urandom(SALT_BYTES)))
+        self._verify(password, self._dummy_hash)
+        return False, False
+
+    def _submit(self, fn, *args):
+        if not self._pending.acquire(blocking=False):
+            raise CredentialsBusy("Too many logins in progress")
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(lambda _: self._pending.release())
+        return future
+
+    def hash(self, password: str) -> str:
+        """Hash a password for storage in USER_PASSWORD"""
+        return self._submit(self._hash, password).result()
+
+    def hash_many(self, passwords: List[str]) -> List[str]:
+        """Hash many passwords on all workers, e.g. for a bulk import; not subject to max_pending"""
+        return list(self._executor.map(self._hash, passwords))
+
+    def verify(self, password: str, stored: Optional[str]) -> Tuple[bool, bool]:
+        """
+        Check a password against a stored USER_PASSWORD value
+
+        `stored` is None for an unknown user: a dummy hash is checked then,
+        so unknown and known user names take the same time.
+
+        Returns:
+            Tuple[bool, bool]: whether the password matches, and whether the
+                stored value should be replaced by hash(password) (legacy plain
+                text, or a hash made with other cost parameters)
+        """
+        return self._submit(self._verify_unknown if stored is None else self._verify, password, stored).result()
+
+@st.cache_resource
+def get_password_hasher():
+    """
+    Get the process-wide password hasher; CREDENTIALS_SCRYPT_N, CREDENTIALS_SCRYPT_R
+    and CREDENTIALS_SCRYPT_P set the cost, CREDENTIALS_WORKERS (default: one per core)
+    and CREDENTIALS_MAX_PENDING bound concurrent verifications
+    """
+    return PasswordHasher(
+        n=int(os.getenv('CREDENTIALS_SCRYPT_N', str(DEFAULT_N))),
+        r=int(os.getenv('CREDENTIALS_SCRYPT_R', str(DEFAULT_R))),
+        p=int(os.getenv('CREDENTIALS_SCRYPT_P', str(DEFAULT_P))),
+        max_workers=int(os.getenv('CREDENTIALS_WORKERS', str(os.cpu_count() or 1))),
+        max_pending=int(os.getenv('CREDENTIALS_MAX_PENDING', '64'))
+    )
@@ -1,44 +1,259 @@
+import os
+import logging
+from concurrent.futures import TimeoutError as FutureTimeout
 import streamlit as st
-import pandas as pd
-from snowflake.snowpark.context import get_active_session
+from utils.credentials import CredentialsBusy, get_password_hasher
+from utils.snowflake_session import get_session_manager
+from utils.profile import PROFILE_COLUMNS, DietaryGoals, UserProfile
+from utils.profile_cache import get_profile_cache
+from utils.write_buffer import get_user_write_buffer
+
+logger = logging.getLogger(__name__)
+
+USERS_TABLE = "HACKATON.USERS_DATA.USERS"
+
+# Point lookup on USER_NAME, served by the search optimization in migrations/001_users_search_optimization.sql;
+# the password hash is checked by utils.credentials, not by the warehouse. Several rows only come back for
+# names shared by accounts created before migrations/004_users_unique_name.sql.
+LOGIN_QUERY = """
+SELECT {columns}, USER_PASSWORD FROM {table}
+WHERE USER_NAME = ?
+LIMIT 10
+"""
+
+# Accounts migrations/004_users_unique_name.sql renamed "<name>#<n>", which still log in as "<name>";
+# only looked up when no account named exactly "<name>" has the password
+RENAMED_TABLE = "HACKATON.USERS_DATA.USERS_RENAMED"
+
+RENAMED_QUERY = """
+SELECT USER_NAME FROM {table}
+WHERE LOGIN_NAME = ?
+"""
+
+RENAMED_LOGIN_QUERY = """
+SELECT {columns}, USER_PASSWORD FROM {table}
+WHERE USER_NAME IN ({names})
+"""
+
+# Only replaces the value that was verified, in case the password changed meanwhile
+REHASH_QUERY = """
+UPDATE {table} SET USER_PASSWORD = ?
+WHERE USER_NAME = ? AND USER_PASSWORD = ?
+"""
+
+PROFILE_QUERY = """
+SELECT {columns} FROM {table}
+WHERE USER_NAME = ?
+LIMIT 2
+"""
+
+USER_EXISTS_QUERY = """
+SELECT 1 FROM {table}
+WHERE USER_NAME = ?
+LIMIT 1
+"""
+
+USER_COLUMNS = [
+    "USER_NAME", "USER_PASSWORD", "AGE", "SEX", "WEIGHT", "HEIGHT", "RESTRICTIONS", "ALLERGIES", "PREFERENCES",
+    "GOAL_CALORIES", "GOAL_FIBER", "GOAL_PROTEIN"
+]
+
+# Seconds create_user waits for its row to be committed
+USER_WRITE_TIMEOUT = float(os.getenv('USER_WRITE_TIMEOUT', '30'))
 
 def get_session():
-    """Get Snowflake session"""
-    return get_active_session()
+    """
+    Use a Snowflake session for the duration of a with block; the session
+    is cached per process, or borrowed from a pool for local runs
+    """
+    return get_session_manager().session()
+
+def _verified_row(hasher, password, result):
+    """
+    The row of `result` whose password matches, without USER_PASSWORD,
+    with the stored hash and whether it needs a rehash; None if none matches
+    """
+    # Accounts sharing a name are told apart by their password, as they always were
+    for candidate in (found.as_dict() for found in result):
+        stored = candidate.pop("USER_PASSWORD")
+        matches, needs_rehash = hasher.verify(password, stored)
+        if matches:
+            return candidate, stored, needs_rehash
+    return None
+
+def _renamed_accounts(session, username):
+    """The "<name>#<n>" accounts of a name, see RENAMED_TABLE"""
+    try:
+        names = [row[0] for row in session.sql(RENAMED_QUERY.format(table=RENAMED_TABLE), params=[username]).collect()]
+    except Exception as e:
+        # Before migration 004 there is no such table, nor renamed accounts
+        logger.debug(f"No renamed accounts lookup: {e}")
+        return []
+    if not names:
+        return []
+    query = RENAMED_LOGIN_QUERY.format(
+        columns=", ".join(PROFILE_COLUMNS), table=USERS_TABLE, names=", ".join("?" for _ in names)
+    )
+    return session.sql(query, params=names).collect()
 
 def authenticate_user(username, password):
-    """Authenticate user against Snowflake database"""
+    """
+    Authenticate user against Snowflake database
+
+    Returns:
+        UserProfile: the user's profile, also stored in the profile cache, or None if the credentials don't match
+    """
     try:
-        session = get_session()
-        query = """
-        SELECT * FROM HACKATON.USERS_DATA.USERS 
-        WHERE USER_NAME = ? AND USER_PASSWORD = ?
-        """
-        result = session.sql(query, params=[username, password]).collect()
-        
-        if result:
-            user_data = pd.DataFrame(result)
-            return user_data.iloc[0]
-        else:
+        query = LOGIN_QUERY.format(columns=", ".join(PROFILE_COLUMNS), table=USERS_TABLE)
+        hasher = get_password_hasher()
+        with get_session() as session:
+            result = session.sql(query, params=[username]).collect()
+            if not result:
+                # Same cost for an unknown name as for a wrong password
+                hasher.verify(password, None)
+            verified = _verified_row(hasher, password, result)
+            if verified is None:
+                verified = _verified_row(hasher, password, _renamed_accounts(session, username))
+        if verified is None:
             return None
+        row, stored, needs_rehash = verified
+        if needs_rehash:
+            _rehash_password(row["USER_NAME"], password, stored)
+
+        profile = UserProfile.from_row(row)
+        get_profile_cache().put(profile)
+        return profile
+    except CredentialsBusy:
+        st.error("Too many logins right now, please try again in a moment.")
+        return None
     except Exception as e:
         st.error(f"Authentication error: {str(e)}")
         return None
 
-def create_user(username, password, age, sex, weight, height, dietary_restrictions, dietary_goals):
-    """Create a new user in the database"""
+def _rehash_password(username, password, stored):
+    """Replace a legacy plain-text password, or a hash with outdated cost, after a successful login"""
     try:
-        session = get_session()
-        insert_query = """
-        INSERT INTO HACKATON.USERS_DATA.USERS 
-        (USER_NAME, USER_PASSWORD, AGE, SEX, WEIGHT, HEIGHT, DIETARY_RESTRICTIONS, DIETARY_GOALS)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """
-        session.sql(insert_query, params=[
-            username, password, age, sex, weight, height, 
-            dietary_restrictions, dietary_goals
-        ]).collect()
+        with get_session() as session:
+            session.sql(REHASH_QUERY.format(table=USERS_TABLE),
+                        params=[get_password_hasher().hash(password), username, stored]).collect()
+    except Exception as e:
+        # The login itself succeeded; the upgrade is retried on the next one
+        logger.warning(f"Could not rehash the password of {username}: {e}")
+
+def load_user_profile(username):
+    """Load a user's profile by name, for the profile cache; None if there is no such user"""
+    try:
+        query = PROFILE_QUERY.format(columns=", ".join(PROFILE_COLUMNS), table=USERS_TABLE)
+        with get_session() as session:
+            result = session.sql(query, params=[username]).collect()
+        if len(result) > 1:
+            # Which account is meant is only known at login, see migrations/004_users_unique_name.sql
+            logger.error(f"Several users are named {username}, not loading any of their profiles")
+            return None
+        return UserProfile.from_row(result[0].as_dict()) if result else None
+    except Exception as e:
+        st.error(f"Error loading profile: {str(e)}")
+        return None
+
+def _user_exists(username) -> bool:
+    with get_session() as session:
+        return bool(session.sql(USER_EXISTS_QUERY.format(table=USERS_TABLE), params=[username]).collect())
+
+def create_user(username, password, age, sex, weight, height, restrictions, allergies, preferences, goals):
+    """
+    Create a new user in the database
+
+    Usernames must be unique: a taken one is rejected, here and again when
+    the row is written. The row goes through the user write buffer,
+    batched with concurrent registrations into one MERGE; returns once it
+    has been committed.
+
+    Args:
+        goals (Dict): {"calories": ..., "fiber": ..., "protein": ...}, or None if they could not be generated
+    """
+    try:
+        if "#" in username:
+            # Reserved for the accounts renamed by migrations/004_users_unique_name.sql
+            st.error("Usernames cannot contain '#'.")
+            return False
+        if _user_exists(username):
+            st.error("This username is already taken, please choose another one.")
+            return False
+        profile = UserProfile(
+            user_name=username, age=age, sex=sex, weight=weight, height=height,
+            restrictions=restrictions or "", allergies=allergies or "", preferences=preferences or "",
+            goals=DietaryGoals.from_mapping(goals)
+        )
+        password_hash = get_password_hasher().hash(password)
+        goal_values = [None] * 3 if profile.goals is None else [
+            profile.goals.calories, profile.goals.fiber, profile.goals.protein
+        ]
+        written = get_user_write_buffer().add([
+            username, password_hash, age, sex, weight, height,
+            profile.restrictions, profile.allergies, profile.preferences, *goal_values
+        ])
+        try:
+            created = written.result(timeout=USER_WRITE_TIMEOUT)
+        except FutureTimeout:
+            if written.cancel():
+                st.error("Creating your account is taking too long, nothing was saved. Please try again.")
+            else:
+                # Already being written: it may still succeed, registering again would only find the name taken
+                st.warning("Your account is still being saved. Try logging in in a minute.")
+            return False
+        if not created:
+            # Taken by a concurrent registration since the check above
+            st.error("This username is already taken, please choose another one.")
+            return False
+        # Loaded from the new row on first use, never from what the form submitted
+        get_profile_cache().invalidate(username)
         return True
+    except CredentialsBusy:
+        st.error("Too many requests right now, please try again in a moment.")
+        return False
     except Exception as e:
         st.error(f"Error creating account: {str(e)}")
-        return False
\ No newline at end of file
+        return False
+
+def existing_user_names(usernames):
+    """The names among `usernames` that USERS already has"""
+    usernames = list(dict.fromkeys(usernames))
+    existing = set()
+    with get_session() as session:
+        # Bounded IN lists, each still served by the USER_NAME search optimization
+        for start in range(0, len(usernames), 1000):
+            chunk = usernames[start:start + 1000]
+            query = f"SELECT USER_NAME FROM {USERS_TABLE} WHERE USER_NAME IN ({', '.join('?' for _ in chunk)})"
+            existing.update(row[0] for row in session.sql(query, params=chunk).collect())
+    return existing
+
+def bulk_insert_users(users):
+    """
+    Insert many users at once with write_pandas (a staged COPY INTO)
+
+    Args:
+        users (pd.DataFrame): the USER_COLUMNS; USER_PASSWORD must
+            already be hashed, see utils.credentials.PasswordHasher.hash_many.
+            write_pandas does not check USER_NAME: the names must be valid,
+            distinct and not taken yet, see utils.batch_import.import_users
+
+    Returns:
+        int: number of rows written, or None on error
+    """
+    try:
+        with get_session() as session:
+            session.write_pandas(
+                users[USER_COLUMNS].reset_index(drop=True),
+                "USERS",
+                database="HACKATON",
+                schema="USERS_DATA",
+                auto_create_table=False,
+                overwrite=False
+            )
+        cache = get_profile_cache()
+        for username in users["USER_NAME"]:
+            cache.invalidate(username)
+        return len(users)
+    except Exception as e:
+        st.error(f"Error importing users: {str(e)}")
+        return None
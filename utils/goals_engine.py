@@ -0,0 +1,110 @@
+import os
+import logging
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+import numpy as np
+import pandas as pd
+from utils.jobs import get_job_queue
+
+logger = logging.getLogger(__name__)
+
+class GoalsEngine(ABC):
+    """Abstract base class computing daily dietary goals from a user profile"""
+
+    name = "base"
+
+    @abstractmethod
+    def compute(self, age, sex, weight, height) -> Dict:
+        """Return {"calories": ..., "fiber": ..., "protein": ...} for one profile"""
+        pass
+
+    def compute_many(self, profiles: pd.DataFrame) -> pd.DataFrame:
+        """
+        Compute goals for many profiles (AGE, SEX, WEIGHT, HEIGHT columns)
+        and return them as CALORIES, FIBER and PROTEIN columns
+        """
+        goals = [
+            self.compute(row.AGE, row.SEX, row.WEIGHT, row.HEIGHT)
+            for row in profiles.itertuples(index=False)
+        ]
+        return pd.DataFrame({
+            "CALORIES": [goal["calories"] for goal in goals],
+            "FIBER": [goal["fiber"] for goal in goals],
+            "PROTEIN": [goal["protein"] for goal in goals]
+        }, index=profiles.index)
+
+class MifflinStJeorEngine(GoalsEngine):
+    """
+    Closed-form goals: Mifflin-St Jeor resting energy times an activity
+    factor, protein per kg of body weight, and fiber per 1000 kCal
+    """
+
+    name = "mifflin"
+
+    def __init__(self, activity_factor: float = 1.55, protein_per_kg: float = 1.0,
+                 fiber_per_1000_kcal: float = 14.0):
+        # 1.55 is the usual "moderate activity" factor, matching the LLM prompt
+        self.activity_factor = activity_factor
+        self.protein_per_kg = protein_per_kg
+        self.fiber_per_1000_kcal = fiber_per_1000_kcal
+
+    def _goals(self, age, is_male, weight, height):
+        # Works on scalars and NumPy arrays alike
+        bmr = 10 * weight + 6.25 * height - 5 * age + np.where(is_male, 5, -161)
+        calories = np.round(bmr * self.activity_factor)
+        fiber = np.round(calories / 1000 * self.fiber_per_1000_kcal)
+        protein = np.round(weight * self.protein_per_kg)
+        return calories, fiber, protein
+
+    def compute(self, age, sex, weight, height) -> Dict:
+        is_male = str(sex).strip().upper().startswith("M")
+        calories, fiber, protein = self._goals(float(age), is_male, float(weight), float(height))
+        return {
+            "calories": int(calories),
+            "fiber": int(fiber),
+            "protein": int(protein)
+        }
+
+    def compute_many(self, profiles: pd.DataFrame) -> pd.DataFrame:
+        is_male = profiles["SEX"].astype(str).str.strip().str.upper().str.startswith("M").to_numpy()
+        calories, fiber, protein = self._goals(
+            profiles["AGE"].to_numpy(dtype=float),
+            is_male,
+            profiles["WEIGHT"].to_numpy(dtype=float),
+            profiles["HEIGHT"].to_numpy(dtype=float)
+        )
+        return pd.DataFrame({
+            "CALORIES": calories.astype(int),
+            "FIBER": fiber.astype(int),
+            "PROTEIN": protein.astype(int)
+        }, index=profiles.index)
+
+GOALS_ENGINES = {
+    MifflinStJeorEngine.name: MifflinStJeorEngine,
+}
+
+def get_goals_engine(name: Optional[str] = None) -> Optional[GoalsEngine]:
+    """
+    Get the goals engine selected by name or the GOALS_ENGINE env var
+    (default "mifflin"). Returns None for "llm", meaning the numbers
+    should come from GroqClient.generate_dietary_goals instead.
+    """
+    name = (name or os.getenv('GOALS_ENGINE', MifflinStJeorEngine.name)).lower()
+    if name == "llm":
+        return None
+    if name not in GOALS_ENGINES:
+        raise ValueError(f"Unknown goals engine: {name}")
+    return GOALS_ENGINES[name]()
+
+def _generate_explanation(age, sex, weight, height, goals) -> Optional[str]:
+    # Imported here as the client module is not needed for the local fast path
+    from utils.groq_client import GroqClient
+    try:
+        return GroqClient().generate_goals_explanation(age, sex, weight, height, goals)
+    except Exception as e:
+        logger.error(f"Goals explanation error: {e}")
+        return None
+
+def explain_goals_async(age, sex, weight, height, goals: Dict) -> str:
+    """Start generating the explanation text for locally computed goals, returning the job id"""
+    return get_job_queue().submit_background("goals_explanation", _generate_explanation, age, sex, weight, height, goals)
@@ -0,0 +1,102 @@
+import os
+import time
+import sqlite3
+import tempfile
+import threading
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional, Tuple
+import streamlit as st
+from utils.rate_limiter import BACKGROUND
+
+def profile_bucket(age, sex, weight, height) -> Tuple[int, str, int, int]:
+    """Quantize a profile: whole years, kg and cm, and a one-letter sex code"""
+    return (
+        int(round(float(age))),
+        str(sex).strip().upper()[:1],
+        int(round(float(weight))),
+        int(round(float(height)))
+    )
+
+class GoalsMemo:
+    """
+    Persistent memo table of dietary goals responses, keyed by profile bucket.
+
+    Backed by a local SQLite file so it survives app restarts; a single
+    connection is shared between threads behind a lock.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS dietary_goals_memo (
+                    age INTEGER NOT NULL,
+                    sex TEXT NOT NULL,
+                    weight INTEGER NOT NULL,
+                    height INTEGER NOT NULL,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (age, sex, weight, height)
+                )
+            """)
+
+    def get(self, age, sex, weight, height) -> Optional[str]:
+        """Return the memoized response for this profile's bucket, if any"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT response FROM dietary_goals_memo WHERE age = ? AND sex = ? AND weight = ? AND height = ?",
+                profile_bucket(age, sex, weight, height)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, age, sex, weight, height, response: str) -> None:
+        """Store the response for this profile's bucket"""
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO dietary_goals_memo (age, sex, weight, height, response, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (*profile_bucket(age, sex, weight, height), response, time.time())
+            )
+
+    def count(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM dietary_goals_memo").fetchone()[0]
+
+@st.cache_resource
+def get_goals_memo():
+    """
+    Get the process-wide dietary goals memo, stored at GOALS_MEMO_PATH
+    (defaults to a file in the system temp directory)
+    """
+    path = os.getenv('GOALS_MEMO_PATH', os.path.join(tempfile.gettempdir(), 'dietary_goals_memo.sqlite'))
+    return GoalsMemo(path)
+
+def prewarm_goals_memo(groq_client, ages: Iterable, sexes: Iterable, weights: Iterable,
+                       heights: Iterable, max_workers: int = 4) -> int:
+    """
+    Fill the memo for every profile in the given grid that is not memoized yet
+
+    Args:
+        groq_client: GroqClient used to generate the missing entries
+        ages, sexes, weights, heights: values spanning the grid
+        max_workers (int): number of concurrent API calls
+
+    Returns:
+        int: number of buckets that were generated
+    """
+    memo = get_goals_memo()
+    missing = [
+        profile for profile in itertools.product(ages, sexes, weights, heights)
+        if memo.get(*profile) is None
+    ]
+
+    # generate_dietary_goals writes to the memo itself
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(
+            lambda profile: groq_client.generate_dietary_goals(*profile, priority=BACKGROUND), missing
+        ))
+
+    return sum(1 for result in results if result)
@@ -1,10 +1,126 @@
-import os, json, requests
+import os, json, time, random, asyncio, hashlib, logging, threading, requests
 import streamlit as st
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout, wait, FIRST_COMPLETED
 from dotenv import load_dotenv
+from utils.http_session import get_http_session, get_phase_timings, reset_phase_timings
+from utils.response_cache import get_response_cache
+from utils.goals_memo import get_goals_memo, profile_bucket
+from utils.single_flight import get_single_flight
+from utils.rate_limiter import get_rate_limiter, estimate_request_tokens, INTERACTIVE, BACKGROUND
+from utils.latency import get_ttfb_tracker
+from utils.telemetry import CallRecord, get_telemetry
+from utils.model_router import get_model_router
+from utils.json_repair import parse_json_object
+from utils.prompts import build_meal_prompt, build_recipe_prompt
+from utils.recipe_store import get_recipe_store
+from utils.recipes import RECIPE_SCHEMA, Recipe, RecipeStreamParser, parse_recipe, parse_recipes, recipes_schema, recipes_to_json
+
+logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
 
+# Retries: attempts per request, full-jitter exponential backoff, and how long a request may queue
+MAX_ATTEMPTS = int(os.getenv('GROQ_MAX_ATTEMPTS', '3'))
+BACKOFF_BASE = float(os.getenv('GROQ_BACKOFF_BASE', '0.5'))
+BACKOFF_CAP = float(os.getenv('GROQ_BACKOFF_CAP', '8'))
+REQUEST_TIMEOUT = float(os.getenv('GROQ_TIMEOUT', '30'))
+QUEUE_TIMEOUT = float(os.getenv('GROQ_QUEUE_TIMEOUT', '60'))
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Hedging: if no first byte arrives within the p95 time to first byte (times a multiplier),
+# send a duplicate request and keep whichever answers first
+HEDGE_ENABLED = os.getenv('GROQ_HEDGE', 'false').lower() == 'true'
+HEDGE_MULTIPLIER = float(os.getenv('GROQ_HEDGE_MULTIPLIER', '1.0'))
+HEDGE_MIN_SAMPLES = int(os.getenv('GROQ_HEDGE_MIN_SAMPLES', '20'))
+
+# GROQ_RECIPE_FANOUT=true asks for each recipe concurrently instead of in one completion
+RECIPE_FANOUT = os.getenv('GROQ_RECIPE_FANOUT', 'false').lower() == 'true'
+
+# Structured output for non-streamed calls: "schema" (json_schema), "object" (json_object) or "off"
+JSON_MODE = os.getenv('GROQ_JSON_MODE', 'object').lower()
+
+GOALS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "explanation": {"type": "string"},
+        "calories": {"type": "number"},
+        "fiber": {"type": "number"},
+        "protein": {"type": "number"}
+    },
+    "required": ["explanation", "calories", "fiber", "protein"],
+    "additionalProperties": False
+}
+
+GOALS_BATCH_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "goals": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "integer"},
+                    "calories": {"type": "number"},
+                    "fiber": {"type": "number"},
+                    "protein": {"type": "number"}
+                },
+                "required": ["id", "calories", "fiber", "protein"],
+                "additionalProperties": False
+            }
+        }
+    },
+    "required": ["goals"],
+    "additionalProperties": False
+}
+
+# Plausible daily goals; answers outside these ranges are escalated to the next model
+GOALS_RANGES = {"calories": (1000, 5000), "fiber": (10, 80), "protein": (20, 300)}
+
+def _acceptable_goals(content):
+    """Whether a goals answer parses and has plausible numbers"""
+    goals = parse_json_object(content)
+    if not goals:
+        return False
+    try:
+        return all(low <= float(goals[key]) <= high for key, (low, high) in GOALS_RANGES.items())
+    except (KeyError, TypeError, ValueError):
+        return False
+
+def _acceptable_recipes(recipes, count=3):
+    """Whether all recipes came back complete, with ingredients and calories"""
+    return (len(recipes) >= count
+            and all(recipe.complete and recipe.ingredients and recipe.calories is not None for recipe in recipes))
+
+def _response_format(name, schema):
+    """The response_format asking for JSON output, per GROQ_JSON_MODE"""
+    if JSON_MODE == 'schema':
+        return {"type": "json_schema", "json_schema": {"name": name, "schema": schema}}
+    if JSON_MODE == 'object':
+        return {"type": "json_object"}
+    return None
+
+def _retry_after(headers, default=1.0):
+    """Seconds to wait according to a Retry-After header"""
+    try:
+        return float(headers.get('retry-after', default))
+    except ValueError:
+        return default
+
+def _backoff(attempt):
+    """Full-jitter exponential backoff delay before retrying after `attempt` failed"""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+def _close_response(future):
+    """Release the connection of a request that lost the hedging race"""
+    if future.exception() is None:
+        future.result().close()
+
+@st.cache_resource
+def get_hedge_executor():
+    """Get the worker pool that runs primary and hedged requests side by side"""
+    return ThreadPoolExecutor(max_workers=int(os.getenv('HTTP_POOL_SIZE', '10')), thread_name_prefix="groq-hedge")
+
 class GroqClient:
     def __init__(self):
         """Initialize Groq client with API key from environment"""
@@ -21,37 +137,277 @@ class GroqClient:
             'Content-Type': 'application/json'
         }
 
-    def _make_api_call(self, messages, temperature=0.3, max_tokens=4000):
-        """Make a call to the Groq API"""
+        # Shared keep-alive pool, so repeated calls skip the TCP+TLS handshake
+        self.session = get_http_session()
+
+        # Token counts of the last call, see _record_usage
+        self.last_usage = None
+        self.last_stream_usage = None
+
+    def _make_api_call(self, messages, temperature=0.3, max_tokens=4000, priority=INTERACTIVE, response_format=None,
+                       task="chat", model=None):
+        """
+        Make a call to the Groq API, sharing the result of an identical call already in flight
+
+        `task` labels the call in the telemetry, see utils.telemetry; `model` overrides GROQ_MODEL
+        """
+        payload = {
+            "model": model or self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }
+        if response_format:
+            payload["response_format"] = response_format
+        result, shared = get_single_flight().do(
+            self._payload_hash(payload), lambda: self._send_request(payload, priority, task)
+        )
+        if shared:
+            get_telemetry().record(CallRecord(task=task, model=payload['model'] or '', outcome="coalesced", cache_hit=True))
+            if result is None:
+                st.error("API request failed")
+        return result
+
+    def _post(self, payload, priority):
+        """
+        POST a request once the rate limiter admits it, retrying network errors,
+        429 and 5xx responses with jittered exponential backoff
+
+        Every attempt is admitted by the limiter; the tokens estimated for a
+        failed one are refunded, so only the final attempt's estimate is left
+        to reconcile with the reported usage.
+
+        Returns:
+            Tuple: the response (None if it never got admitted), the estimated token usage
+            and the number of retries
+        """
+        limiter = get_rate_limiter()
+        estimated_tokens = estimate_request_tokens(payload)
+
+        for attempt in range(MAX_ATTEMPTS):
+            last_attempt = attempt == MAX_ATTEMPTS - 1
+            if not limiter.acquire(estimated_tokens, priority, timeout=QUEUE_TIMEOUT):
+                st.error("The AI service is busy right now, please try again in a moment.")
+                return None, estimated_tokens, attempt
+
+            try:
+                response = self._hedged_post(payload, estimated_tokens)
+            except requests.exceptions.RequestException:
+                limiter.record_usage(estimated_tokens, 0)
+                if last_attempt:
+                    raise
+                time.sleep(_backoff(attempt))
+                continue
+
+            limiter.update_from_headers(response.headers)
+            if response.status_code in RETRY_STATUSES and not last_attempt:
+                limiter.record_usage(estimated_tokens, 0)
+                if response.status_code == 429 and 'retry-after' in response.headers:
+                    limiter.pause(_retry_after(response.headers))
+                else:
+                    time.sleep(_backoff(attempt))
+                response.close()
+                continue
+            return response, estimated_tokens, attempt
+
+    def _timed_post(self, payload):
+        """
+        POST and return as soon as the response headers arrive, recording the time to first byte
+
+        The connect and first-byte seconds of the request are attached as `response.phase_timings`.
+        """
+        reset_phase_timings()
+        started = time.monotonic()
+        response = self.session.post(
+            self.api_url,
+            headers=self.headers,
+            json=payload,
+            timeout=REQUEST_TIMEOUT,
+            stream=True
+        )
+        ttfb = time.monotonic() - started
+        get_ttfb_tracker().record(payload['model'] or '', ttfb)
+        response.phase_timings = {**get_phase_timings(), "ttfb": ttfb}
+        return response
+
+    def _hedged_post(self, payload, estimated_tokens):
+        """Send the request, and a duplicate if the first byte is slower than usual"""
+        hedge_delay = None
+        if HEDGE_ENABLED:
+            p95 = get_ttfb_tracker().percentile(payload['model'] or '', 95, min_samples=HEDGE_MIN_SAMPLES)
+            hedge_delay = p95 * HEDGE_MULTIPLIER if p95 is not None else None
+        if hedge_delay is None:
+            return self._timed_post(payload)
+
+        executor = get_hedge_executor()
+        started = threading.Event()
+
+        def primary_post():
+            started.set()
+            return self._timed_post(payload)
+
+        primary = executor.submit(primary_post)
+        # Time spent waiting for a free worker is not the server being slow, it does not count
+        started.wait()
         try:
-            payload = {
-                "model": self.model,
-                "messages": messages,
-                "temperature": temperature,
-                "max_tokens": max_tokens
-            }
-            
-            response = requests.post(
-                self.api_url,
-                headers=self.headers,
-                json=payload,
-                timeout=30
-            )
-            
+            return primary.result(timeout=hedge_delay)
+        except FuturesTimeout:
+            pass
+
+        # The duplicate must fit in the budget right away, otherwise keep waiting on the primary
+        if not get_rate_limiter().acquire(estimated_tokens, BACKGROUND, timeout=0):
+            return primary.result()
+
+        hedge = executor.submit(self._timed_post, payload)
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    # The other one may have finished too, or still be running
+                    loser = hedge if future is primary else primary
+                    loser.add_done_callback(_close_response)
+                    return future.result()
+        # Both failed: surface the primary's error
+        return primary.result()
+
+    def _record_call(self, task, payload, started, response=None, retries=0, outcome="ok", usage=None, streamed=False):
+        """Report one upstream call to the telemetry"""
+        usage = usage or {}
+        timings = getattr(response, 'phase_timings', {})
+        get_telemetry().record(CallRecord(
+            task=task,
+            model=payload['model'] or '',
+            status=response.status_code if response is not None else None,
+            outcome=outcome,
+            connect=timings.get('connect'),
+            ttfb=timings.get('ttfb'),
+            total=time.monotonic() - started,
+            prompt_tokens=usage.get('prompt_tokens'),
+            completion_tokens=usage.get('completion_tokens'),
+            cost=get_model_router().cost(payload['model'], usage),
+            retries=retries,
+            streamed=streamed
+        ))
+
+    def _send_request(self, payload, priority=INTERACTIVE, task="chat"):
+        """Send one chat-completions request to the Groq API"""
+        started = time.monotonic()
+        # Stays None only when _post raised, after its last attempt
+        retries = None
+        try:
+            response, estimated_tokens, retries = self._post(payload, priority)
+            if response is None:
+                self._record_call(task, payload, started, retries=retries, outcome="rejected")
+                return None
+
             if response.status_code == 200:
-                return response.json()
+                data = response.json()
+                get_rate_limiter().record_usage(estimated_tokens, data.get('usage', {}).get('total_tokens'))
+                self._record_call(task, payload, started, response, retries, usage=data.get('usage'))
+                return data
             else:
+                self._record_call(task, payload, started, response, retries, outcome="http_error")
                 st.error(f"API request failed with status {response.status_code}: {response.text}")
                 return None
 
+        except json.JSONDecodeError as e:
+            # A 200 whose body is not JSON; requests' own JSONDecodeError is a RequestException too
+            self._record_call(task, payload, started, response, retries, outcome="bad_response")
+            st.error(f"Invalid response from the API: {str(e)}")
+            return None
         except requests.exceptions.RequestException as e:
+            self._record_call(task, payload, started, retries=MAX_ATTEMPTS - 1 if retries is None else retries,
+                              outcome="network_error")
             st.error(f"Network error during API call: {str(e)}")
             return None
         except Exception as e:
+            self._record_call(task, payload, started, retries=retries or 0, outcome="error")
             st.error(f"Unexpected error during API call: {str(e)}")
             return None
         
-    def generate_dietary_goals(self, age, sex, weight, height):      
+    def _payload_hash(self, payload):
+        return hashlib.sha256(
+            (self.api_url + json.dumps(payload, sort_keys=True)).encode('utf-8')
+        ).hexdigest()
+
+    def _stream_api_call(self, messages, temperature=0.3, max_tokens=4000, priority=INTERACTIVE, task="chat", model=None):
+        """Make a streaming call to the Groq API, yielding content deltas as they arrive"""
+        payload = {
+            "model": model or self.model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": True
+        }
+
+        # Identical concurrent streams are read once upstream and replayed to every caller
+        yield from get_single_flight().stream(
+            self._payload_hash(payload), lambda: self._send_stream_request(payload, priority, task)
+        )
+
+    def _send_stream_request(self, payload, priority=INTERACTIVE, task="chat"):
+        """Send one streaming chat-completions request, yielding content deltas"""
+        started = time.monotonic()
+        # retries stays None only when _post raised, after its last attempt
+        response, retries, usage = None, None, None
+        try:
+            response, estimated_tokens, retries = self._post(payload, priority)
+            if response is None:
+                self._record_call(task, payload, started, retries=retries, outcome="rejected", streamed=True)
+                return
+
+            with response:
+                if response.status_code != 200:
+                    self._record_call(task, payload, started, response, retries, outcome="http_error", streamed=True)
+                    st.error(f"API request failed with status {response.status_code}: {response.text}")
+                    return
+
+                # Server-sent events: one "data: {...}" line per chunk, "data: [DONE]" at the end
+                response.encoding = 'utf-8'
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith('data:'):
+                        continue
+                    data = line[len('data:'):].strip()
+                    if data == '[DONE]':
+                        break
+
+                    chunk = json.loads(data)
+                    choices = chunk.get('choices') or []
+                    if choices:
+                        delta = choices[0].get('delta', {}).get('content')
+                        if delta:
+                            yield delta
+
+                    # Groq reports usage on the last chunk, under x_groq
+                    chunk_usage = chunk.get('usage') or chunk.get('x_groq', {}).get('usage')
+                    if chunk_usage:
+                        usage = chunk_usage
+                        self.last_stream_usage = usage
+                        get_rate_limiter().record_usage(estimated_tokens, usage.get('total_tokens'))
+
+            self._record_call(task, payload, started, response, retries, usage=usage, streamed=True)
+
+        except json.JSONDecodeError as e:
+            self._record_call(task, payload, started, response, retries, outcome="bad_response", streamed=True)
+            st.error(f"Invalid response from the API: {str(e)}")
+        except requests.exceptions.RequestException as e:
+            self._record_call(task, payload, started, response, MAX_ATTEMPTS - 1 if retries is None else retries,
+                              outcome="network_error", streamed=True)
+            st.error(f"Network error during API call: {str(e)}")
+        except Exception as e:
+            self._record_call(task, payload, started, response, retries or 0, outcome="error", streamed=True)
+            st.error(f"Unexpected error during API call: {str(e)}")
+
+    def generate_dietary_goals(self, age, sex, weight, height, priority=INTERACTIVE):      
+        # Goals only depend on the quantized profile, so identical buckets share one LLM call
+        age, sex, weight, height = profile_bucket(age, sex, weight, height)
+        memo = get_goals_memo()
+        memoized = memo.get(age, sex, weight, height)
+        if memoized:
+            self._record_cache_hit("dietary_goals")
+            return memoized
+
         # Create prompt for LLM
         prompt = f"""
         Based on the following user profile, generate personalized daily dietary goals:
@@ -89,142 +445,412 @@ class GroqClient:
                 "content": prompt
             }
         ]
-        response = self._make_api_call(messages)
-        
-        if response and 'choices' in response:
-            return response['choices'][0]['message']['content']
-        else:
+
+        def call(model):
+            response = self._make_api_call(
+                messages, priority=priority, response_format=_response_format("dietary_goals", GOALS_SCHEMA),
+                task="dietary_goals", model=model
+            )
+            if response and 'choices' in response:
+                return response['choices'][0]['message']['content']
             return None
+
+        # Escalates to the next model of GROQ_MODEL_GOALS on unparseable or implausible goals
+        content = get_model_router().run("dietary_goals", call, _acceptable_goals)
+        # Only memoize responses that carry usable goals
+        if content is not None and _acceptable_goals(content):
+            memo.put(age, sex, weight, height, content)
+        return content
             
     
-    def generate_meal_recommendations(self, user_data, meal_preferences):
+    def generate_dietary_goals_batch(self, profiles, priority=BACKGROUND):
+        """
+        Generate dietary goals for many profiles in a single request
+
+        Args:
+            profiles: list of (age, sex, weight, height) tuples
+            priority: rate limiter priority, background by default
+
+        Returns:
+            List: one goals JSON string per profile (without explanation), None where no usable goals came back
+        """
+        buckets = [profile_bucket(*profile) for profile in profiles]
+        profile_lines = "\n".join(
+            f"{i}: {age} years, {sex}, {weight} kg, {height} cm" for i, (age, sex, weight, height) in enumerate(buckets)
+        )
+        prompt = f"""
+        Based on the following user profiles, generate personalized daily dietary goals for each of them:
+        Calories (considering moderate activity level, in kCal/day), Fiber (in grams/day) and Protein (in grams/day).
+        
+        User Profiles, one per line as "id: age, sex, weight, height":
+        {profile_lines}
+        
+        Format your response as a JSON object with the following structure, with one entry per profile:
+        {{
+            "goals": [{{"id": <profile id>, "calories": <number>, "fiber": <number>, "protein": <number>}}, ...]
+        }}
+        
+        Consider standard nutritional guidelines and each user's specific profile.
+        Limit your response to the block of JSON.
+        """
+
+        messages = [
+            {
+                "role": "system",
+                "content": "You are a nutritionist AI that provides personalized dietary recommendations. Always respond with valid JSON format."
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
+
+        def call(model):
+            response = self._make_api_call(
+                messages, max_tokens=100 + 40 * len(buckets), priority=priority,
+                response_format=_response_format("dietary_goals_batch", GOALS_BATCH_SCHEMA),
+                task="dietary_goals_batch", model=model
+            )
+            if not response or 'choices' not in response:
+                return None
+            data = parse_json_object(response['choices'][0]['message']['content']) or {}
+            results = [None] * len(buckets)
+            for item in data.get('goals') or []:
+                if not isinstance(item, dict) or not isinstance(item.get('id'), int) or not 0 <= item['id'] < len(buckets):
+                    continue
+                content = json.dumps({key: item.get(key) for key in GOALS_RANGES})
+                if _acceptable_goals(content):
+                    results[item['id']] = content
+            return results
+
+        # Escalates when any profile is missing or implausible in the answer
+        results = get_model_router().run("dietary_goals", call, all) or [None] * len(buckets)
+        memo = get_goals_memo()
+        for bucket, content in zip(buckets, results):
+            if content is not None:
+                memo.put(*bucket, content)
+        return results
+
+    def generate_goals_explanation(self, age, sex, weight, height, goals):
+        """Explain, in a few sentences, dietary goals that were computed locally"""
+        prompt = f"""
+        The following daily dietary goals were computed for a user with standard equations
+        (Mifflin-St Jeor with a moderate activity level, protein per kg of body weight, fiber per 1000 kCal):
+        
+        User Profile:
+        - Age: {age} years
+        - Sex: {sex}
+        - Weight: {weight} kg
+        - Height: {height} cm
+        
+        Goals:
+        - Calories: {goals['calories']} kCal/day
+        - Fiber: {goals['fiber']} g/day
+        - Protein: {goals['protein']} g/day
+        
+        Briefly explain these recommendations to the user in 2 or 3 sentences of plain text.
+        """
+
+        messages = [
+            {
+                "role": "system",
+                "content": "You are a nutritionist AI that provides personalized dietary recommendations."
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
+
+        def call(model):
+            response = self._make_api_call(
+                messages, max_tokens=200, priority=BACKGROUND, task="goals_explanation", model=model
+            )
+            if response and 'choices' in response:
+                return response['choices'][0]['message']['content'].strip()
+            return None
+
+        return get_model_router().run("goals_explanation", call, bool)
+
+    def _build_meal_prompt(self, user_data, meal_preferences):
+        """Build the prompt asking for 3 recipes matching the user's profile (a UserProfile)"""
+        return build_meal_prompt(user_data.restrictions_text, meal_preferences, user_data.goals_text)
+
+    def _build_recipe_prompt(self, user_data, meal_preferences, diversity_hint):
+        """Build the prompt asking for a single recipe, steered by a diversity hint"""
+        return build_recipe_prompt(user_data.restrictions_text, meal_preferences, user_data.goals_text, diversity_hint)
+
+    def _record_usage(self, task, prompt, usage):
+        """Keep and log the prompt/completion token counts of the last call for this task"""
+        usage = usage or {}
+        report = {
+            "task": task,
+            "prompt_tokens": usage.get('prompt_tokens'),
+            "completion_tokens": usage.get('completion_tokens'),
+            "estimated_prompt_tokens": prompt.token_report()
+        }
+        self.last_usage = report
+        logger.info(
+            f"[GROQ] {task}: {report['prompt_tokens']} prompt tokens "
+            f"(estimated {report['estimated_prompt_tokens']}), {report['completion_tokens']} completion tokens"
+        )
+        return report
+
+    def _record_cache_hit(self, task):
+        """Report an answer served from the response cache or goals memo to the telemetry"""
+        get_telemetry().record_cache_hit(task, get_model_router().chain(task)[0])
+
+    def _meal_cache_context(self, user_data):
+        """The part of a meal prompt that is fixed for a given user, used to scope the response cache"""
+        models = ",".join(get_model_router().chain("meal_recommendations"))
+        return f"{models}\n{user_data.restrictions_text}\n{user_data.goals_text}"
+
+    def _stored_recipes(self, user_data, meal_preferences, count=3):
+        """Retrieval-first: stored recipes that answer the request, or an empty list"""
+        store = get_recipe_store()
+        recipes = store.retrieve(user_data, meal_preferences, count) if store is not None else []
+        if recipes:
+            logger.info("[RECIPES] Answered from the recipe store")
+            self._record_cache_hit("meal_recommendations")
+        return recipes
+
+    def _store_recipes(self, user_data, recipes):
+        """Keep generated recipes for retrieval and later requests"""
+        store = get_recipe_store()
+        if store is not None and recipes:
+            store.remember(recipes, user_data)
+
+    def generate_meal_recommendations(self, user_data, meal_preferences, priority=INTERACTIVE):
         """
         Generate meal recommendations based on user data and preferences
+
+        Returns:
+            List[Recipe]: the recipes, or None if none could be generated
         """
         try:
-            try:
-                goals = json.loads(user_data.get('DIETARY_GOALS'))
-                goals_str = f"""
-                Calories: {goals['calories']} kCal/day ({round(goals['calories']/3)} kCal per meal)
-                Fiber: {goals['fiber']} g/day ({round(goals['fiber']/3)} grams per meal)
-                Protein: {goals['protein']} g/day ({round(goals['protein']/3)} grams per meal)
-                """
-            except:
-                goals_str = user_data.get('DIETARY_GOALS')
-                st.error(f"diet goals might be incorrectly parsed: {goals_str}")
-
-            prompt = f"""
-            Please generate 3 recipes, with the following constraints:
-            - The client has the following dietary and preferences: {user_data.get('DIETARY_RESTRICTIONS', 'None')}
-            - The client has given the following instructions for today: {meal_preferences}
-            - Dietary Goals: {goals_str}
-            
-            Format your response as a JSON object with the following structure:
-            {{
-                "recipe 1" : {{
-                    "title": "<the recipe's name>",
-                    "instructions": "<instructions of the recipe>",
-                    "time": "<estimated preparation time in minutes>",
-                    "ingredients": [
-                        "<ingredient 1 (with quantity)>",
-                        "<ingredient 2 (with quantity)>",
-                        etc.
-                    ],
-                    "calories": <number, estimated amount of calories>,
-                    "fiber": <number, estimated amount of fiber>,
-                    "protein": <number, estimated amount of protein>
-                }},
-                "recipe 2" : {{
-                    follow the same structure as recipe 1
-                }},
-                "recipe 3" : {{
-                    follow the same structure as recipe 1
-                }}
-            }}
-    
-            ---
-    
-            Here is an example:
-            {{
-                "recipe 1": {{
-                    "title": "Classic Gazpacho",
-                    "instructions": "1. Combine all ingredients in a blender.\n2. Blend until smooth.\n3. Strain the mixture through a fine-mesh sieve into a large bowl, pressing on the solids to extract as much liquid as possible.\n4. Discard the solids and chill the soup in the refrigerator for at least 2 hours.\n5. Serve cold, garnished with diced cucumber, bell pepper, and croutons if desired.",
-                    "time": 20,
-                    "ingredients": [
-                        "1.5 kg tomatoes",
-                        "1 cucumber",
-                        "1 red bell pepper",
-                        "1 small red onion",
-                        "2 cloves garlic",
-                        "500 ml tomato juice",
-                        "120 ml extra-virgin olive oil",
-                        "30 ml red wine vinegar",
-                        "Salt and pepper"
-                    ],
-                    "calories": 500,
-                    "fiber": 10,
-                    "protein": 20
-                }},
-                "recipe 2": {{
-                    "title": "Caprese Salad",
-                    "instructions": "1. Slice the tomatoes and mozzarella into 1/4-inch thick slices.\n2. Arrange the tomato and mozzarella slices alternately on a platter.\n3. Drizzle with olive oil and balsamic glaze.\n4. Sprinkle with salt and pepper to taste.\n5. Garnish with fresh basil leaves.\n6. Serve immediately.",
-                    "time": 15,
-                    "ingredients": [
-                        "4 large  tomatoes",
-                        "250 g fresh mozzarella cheese",
-                        "1/4 cup fresh basil leaves",
-                        "2 tbsp extra-virgin olive oil",
-                        "2 tbsp balsamic glaze",
-                        "Salt and pepper"
-                    ],
-                    "calories": 450,
-                    "fiber": 12,
-                    "protein": 18
-                }},
-                "recipe 3": {{
-                    "title": "Chicken Caesar Salad",
-                    "instructions": "1. In a large bowl, combine the chopped romaine lettuce, grilled chicken breast, croutons, and shredded Parmesan cheese.\n2. In a small bowl, whisk together the Caesar dressing and lemon juice.\n3. Pour the dressing over the salad and toss to coat evenly.\n4. Season with salt and pepper to taste.\n5. Serve immediately.",
-                    "time": 20,
-                    "ingredients": [
-                        "1 head romaine lettuce",
-                        "2 chicken breasts",
-                        "2 cups croutons",
-                        "1/2 cup shredded Parmesan cheese",
-                        "1/2 cup Caesar dressing",
-                        "1 tbsp lemon juice",
-                        "Salt and pepper"
-                    ],
-                    "calories": 520,
-                    "fiber": 12,
-                    "protein": 25
-                }}
-            }}
-    
-            ---
-    
-            Try to give varied recipes. Do not add styling, markdown or line breaks inside the instructions.
-            The recipes need to be JSON-safe, this is important ! 
-            
-            """
-            
-            messages = [
-                {
-                    "role": "system",
-                    "content": "You are a helpful assistant for nutrition and cooking."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ]
-            
-            response = self._make_api_call(messages, temperature=0.7, max_tokens=1500)
+            cache = get_response_cache()
+            cache_context = self._meal_cache_context(user_data)
+            cached = cache.get(cache_context, meal_preferences)
+            if cached:
+                self._record_cache_hit("meal_recommendations")
+                return parse_recipes(cached)
 
-            if response and 'choices' in response:
-                return response['choices'][0]['message']['content']
-            else:
+            stored = self._stored_recipes(user_data, meal_preferences)
+            if stored:
+                return stored
+
+            prompt = self._build_meal_prompt(user_data, meal_preferences)
+
+            def call(model):
+                response = self._make_api_call(
+                    prompt.messages(), temperature=0.7, max_tokens=1500, priority=priority,
+                    response_format=_response_format("recipes", recipes_schema(3)), task="meal_recommendations",
+                    model=model
+                )
+                if not response or 'choices' not in response:
+                    return None
+                self._record_usage("meal_recommendations", prompt, response.get('usage'))
+                content = response['choices'][0]['message']['content']
+                return content, parse_recipes(content)
+
+            # Escalates to the next model of GROQ_MODEL_RECIPES on missing or incomplete recipes
+            result = get_model_router().run(
+                "meal_recommendations", call, lambda result: _acceptable_recipes(result[1])
+            )
+            if result is None:
                 return None
+
+            content, recipes = result
+            if recipes and all(recipe.complete for recipe in recipes):
+                cache.put(cache_context, meal_preferences, content)
+            self._store_recipes(user_data, recipes)
+            return recipes or None
                 
         except Exception as e:
             st.error(f"Error generating meal recommendations: {str(e)}")
-            return None
\ No newline at end of file
+            return None
+
+    def stream_meal_recommendations(self, user_data, meal_preferences):
+        """
+        Stream meal recommendations, yielding each Recipe as soon as its
+        JSON object is complete in the streamed output
+        """
+        try:
+            cache = get_response_cache()
+            cache_context = self._meal_cache_context(user_data)
+            cached = cache.get(cache_context, meal_preferences)
+            if cached:
+                self._record_cache_hit("meal_recommendations")
+                yield from parse_recipes(cached)
+                return
+
+            stored = self._stored_recipes(user_data, meal_preferences)
+            if stored:
+                yield from stored
+                return
+
+            # JSON mode is not available for streamed completions, the parser copes with stray output
+            prompt = self._build_meal_prompt(user_data, meal_preferences)
+            router = get_model_router()
+            chain = router.chain("meal_recommendations")
+            for i, model in enumerate(chain):
+                parser = RecipeStreamParser()
+                self.last_stream_usage = None
+                for delta in self._stream_api_call(prompt.messages(), temperature=0.7, max_tokens=1500,
+                                                   task="meal_recommendations", model=model):
+                    yield from parser.feed(delta)
+                self._record_usage("meal_recommendations", prompt, self.last_stream_usage)
+
+                complete = parser.count > 0
+                partial = parser.finish()
+                yield from partial
+                # Recipes already shown cannot be taken back, so only escalate when there were none
+                if parser.count > 0 or i == len(chain) - 1:
+                    break
+                router.record_escalation("meal_recommendations", model)
+
+            if complete and not partial:
+                cache.put(cache_context, meal_preferences, parser.buffer)
+                self._store_recipes(user_data, parse_recipes(parser.buffer))
+
+        except Exception as e:
+            st.error(f"Error generating meal recommendations: {str(e)}")
+
+
+# Steers each concurrent single-recipe request towards a different kind of meal
+DIVERSITY_HINTS = [
+    "a warm, cooked main dish",
+    "a fresh salad or cold dish",
+    "a bowl, stew or one-pot dish based on grains or legumes",
+    "a quick dish from a different cuisine than usual",
+    "a dish built around vegetables as the main ingredient",
+]
+
+class AsyncGroqClient(GroqClient):
+    """
+    GroqClient variant that asks for each recipe in its own, smaller
+    completion and runs these requests concurrently with asyncio
+    """
+
+    def __init__(self, recipe_count=3):
+        super().__init__()
+        self.recipe_count = recipe_count
+
+    async def _make_api_call_async(self, messages, temperature=0.3, max_tokens=4000, response_format=None,
+                                   task="chat", model=None):
+        """Awaitable API call, run on a worker thread over the pooled HTTP session"""
+        return await asyncio.to_thread(
+            self._make_api_call, messages, temperature, max_tokens, INTERACTIVE, response_format, task, model
+        )
+
+    async def generate_recipe(self, user_data, meal_preferences, diversity_hint):
+        """Generate a single Recipe, or None if it could not be generated"""
+        prompt = self._build_recipe_prompt(user_data, meal_preferences, diversity_hint)
+        router = get_model_router()
+        chain = router.chain("recipe")
+        recipe = None
+        for i, model in enumerate(chain):
+            response = await self._make_api_call_async(
+                prompt.messages(), temperature=0.7, max_tokens=600,
+                response_format=_response_format("recipe", RECIPE_SCHEMA), task="recipe", model=model
+            )
+            if response and 'choices' in response:
+                self._record_usage("recipe", prompt, response.get('usage'))
+                recipe = parse_recipe(response['choices'][0]['message']['content']) or recipe
+                if recipe is not None and _acceptable_recipes([recipe], count=1):
+                    break
+            if i < len(chain) - 1:
+                router.record_escalation("recipe", model)
+        return recipe
+
+    def _recipe_tasks(self, loop, user_data, meal_preferences):
+        hints = [DIVERSITY_HINTS[i % len(DIVERSITY_HINTS)] for i in range(self.recipe_count)]
+        return {
+            loop.create_task(self.generate_recipe(user_data, meal_preferences, hint))
+            for hint in hints
+        }
+
+    async def generate_meal_recommendations_async(self, user_data, meal_preferences):
+        """Generate all recipes concurrently and return them as a list of Recipe"""
+        cache = get_response_cache()
+        cache_context = self._meal_cache_context(user_data)
+        cached = cache.get(cache_context, meal_preferences)
+        if cached:
+            self._record_cache_hit("meal_recommendations")
+            return parse_recipes(cached)
+
+        stored = self._stored_recipes(user_data, meal_preferences, self.recipe_count)
+        if stored:
+            return stored
+
+        tasks = self._recipe_tasks(asyncio.get_running_loop(), user_data, meal_preferences)
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        recipes = [recipe for recipe in results if isinstance(recipe, Recipe)]
+        if not recipes:
+            return None
+
+        cache.put(cache_context, meal_preferences, recipes_to_json(recipes))
+        self._store_recipes(user_data, recipes)
+        return recipes
+
+    def generate_meal_recommendations(self, user_data, meal_preferences):
+        """
+        Generate meal recommendations with concurrent per-recipe requests
+        """
+        try:
+            return asyncio.run(self.generate_meal_recommendations_async(user_data, meal_preferences))
+        except Exception as e:
+            st.error(f"Error generating meal recommendations: {str(e)}")
+            return None
+
+    def stream_meal_recommendations(self, user_data, meal_preferences):
+        """
+        Yield recipes in completion order, so the first recipe shows up
+        after the fastest request rather than the slowest
+        """
+        cache = get_response_cache()
+        cache_context = self._meal_cache_context(user_data)
+        cached = cache.get(cache_context, meal_preferences)
+        if cached:
+            self._record_cache_hit("meal_recommendations")
+            yield from parse_recipes(cached)
+            return
+
+        stored = self._stored_recipes(user_data, meal_preferences, self.recipe_count)
+        if stored:
+            yield from stored
+            return
+
+        loop = asyncio.new_event_loop()
+        pending = set()
+        try:
+            pending = self._recipe_tasks(loop, user_data, meal_preferences)
+            recipes = []
+            while pending:
+                done, pending = loop.run_until_complete(
+                    asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                )
+                for task in done:
+                    recipe = None if task.exception() else task.result()
+                    if recipe:
+                        recipes.append(recipe)
+                        yield recipe
+
+            if recipes:
+                cache.put(cache_context, meal_preferences, recipes_to_json(recipes))
+                self._store_recipes(user_data, recipes)
+        except Exception as e:
+            st.error(f"Error generating meal recommendations: {str(e)}")
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                # Let the cancellations run before the loop goes, or the tasks are destroyed still pending
+                loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            loop.close()
+
+def stream_meal_recommendations(user_data, meal_preferences):
+    """Stream recipes with the client selected by GROQ_RECIPE_FANOUT"""
+    groq_client = AsyncGroqClient() if RECIPE_FANOUT else GroqClient()
+    yield from groq_client.stream_meal_recommendations(user_data, meal_preferences)
@@ -0,0 +1,91 @@
+import os
+import time
+import threading
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+# Connection phase timings of the current thread's last request, see get_phase_timings
+_phase_timings = threading.local()
+
+def reset_phase_timings():
+    """Forget the timings of the previous request made on this thread"""
+    _phase_timings.connect = None
+
+def get_phase_timings():
+    """
+    Connect seconds (name resolution, TCP and TLS handshakes) of the last
+    request on this thread; None when a pooled keep-alive connection was reused
+    """
+    return {"connect": getattr(_phase_timings, "connect", None)}
+
+class _TimedConnectionMixin:
+    """Record how long new connections take to open"""
+
+    def connect(self):
+        started = time.monotonic()
+        super().connect()
+        _phase_timings.connect = time.monotonic() - started
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools record connection phase timings"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool
+        }
+
+def _build_session(pool_size, retries):
+    """Create a requests session with a keep-alive connection pool"""
+    # Only connection failures are retried here: the request was never sent,
+    # so retrying a POST is safe. HTTP errors are left to the caller.
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=0,
+        status=0,
+        other=0,
+        backoff_factor=0.2,
+        allowed_methods=None,
+        raise_on_status=False
+    )
+    adapter = TimedHTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=retry,
+        pool_block=False
+    )
+
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+@st.cache_resource
+def get_http_session():
+    """
+    Get the process-wide HTTP session shared by all API clients
+
+    Pool size and connection retries come from HTTP_POOL_SIZE (default 10)
+    and HTTP_CONNECT_RETRIES (default 3).
+    """
+    pool_size = int(os.getenv('HTTP_POOL_SIZE', '10'))
+    retries = int(os.getenv('HTTP_CONNECT_RETRIES', '3'))
+    return _build_session(pool_size, retries)
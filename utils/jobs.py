@@ -0,0 +1,146 @@
+import os
+import time
+import uuid
+import inspect
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Seconds between checks of a running job by the views waiting on it
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '0.5'))
+
+class Job:
+    """
+    A unit of work running on the job queue
+
+    A job whose function returns a generator publishes every yielded item
+    in `partial_results()` as soon as it is produced; its result is then
+    the list of all items.
+    """
+
+    def __init__(self, kind: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = PENDING
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self._partial = []
+        self._lock = threading.Lock()
+        self._finished = threading.Event()
+
+    @property
+    def done(self) -> bool:
+        return self._finished.is_set()
+
+    def partial_results(self) -> List:
+        """Items yielded so far, for generator jobs"""
+        with self._lock:
+            return list(self._partial)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the job has finished; False if the timeout expired first"""
+        return self._finished.wait(timeout)
+
+    def _add_partial(self, item) -> None:
+        with self._lock:
+            self._partial.append(item)
+
+    def _finish(self, status: str, result=None, error: Optional[str] = None) -> None:
+        self.status = status
+        self.result = result
+        self.error = error
+        self.finished_at = time.time()
+        self._finished.set()
+
+class JobQueue:
+    """
+    Run slow work, such as LLM generation, on worker threads independent
+    of Streamlit script runs, so a rerun neither cancels nor repeats it.
+
+    Scripts keep the job id in st.session_state and look the job up on
+    later runs. Finished jobs are kept for `ttl_seconds`.
+
+    Work nobody is waiting for (speculation, explanations) goes to a
+    separate, smaller pool with submit_background(), so it can never hold
+    the workers interactive jobs need, even while it waits for the rate
+    limiter.
+    """
+
+    def __init__(self, max_workers: int = 32, background_workers: int = 2, ttl_seconds: float = 900):
+        self.ttl_seconds = ttl_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="jobs")
+        self._background = ThreadPoolExecutor(max_workers=background_workers, thread_name_prefix="background-jobs")
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, fn: Callable, *args, **kwargs) -> str:
+        """Queue `fn(*args, **kwargs)` for a user waiting on it and return the job id"""
+        return self._submit(self._executor, kind, fn, args, kwargs)
+
+    def submit_background(self, kind: str, fn: Callable, *args, **kwargs) -> str:
+        """Queue `fn(*args, **kwargs)` on the background pool and return the job id"""
+        return self._submit(self._background, kind, fn, args, kwargs)
+
+    def _submit(self, executor: ThreadPoolExecutor, kind: str, fn: Callable, args, kwargs) -> str:
+        job = Job(kind)
+        with self._lock:
+            self._evict_expired()
+            self._jobs[job.id] = job
+        executor.submit(self._run, job, fn, args, kwargs)
+        return job.id
+
+    def get(self, job_id: Optional[str]) -> Optional[Job]:
+        """The job with this id, or None if it is unknown or expired"""
+        with self._lock:
+            self._evict_expired()
+            return self._jobs.get(job_id)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+        return {status: statuses.count(status) for status in (PENDING, RUNNING, DONE, FAILED)}
+
+    def _run(self, job: Job, fn: Callable, args, kwargs) -> None:
+        job.status = RUNNING
+        try:
+            result = fn(*args, **kwargs)
+            if inspect.isgenerator(result):
+                for item in result:
+                    job._add_partial(item)
+                result = job.partial_results()
+            job._finish(DONE, result=result)
+        except Exception as e:
+            logger.error(f"Job {job.kind} {job.id} failed: {e}")
+            job._finish(FAILED, error=str(e))
+
+    def _evict_expired(self) -> None:
+        cutoff = time.time() - self.ttl_seconds
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_at is not None and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+@st.cache_resource
+def get_job_queue():
+    """
+    Get the process-wide job queue. Each running generation holds a worker,
+    so JOB_WORKERS (default 32) should cover the sessions generating at the
+    same time; background work has JOB_BACKGROUND_WORKERS (default 2).
+    Finished jobs are kept for JOB_TTL seconds (default 900)
+    """
+    return JobQueue(
+        max_workers=int(os.getenv('JOB_WORKERS', '32')),
+        background_workers=int(os.getenv('JOB_BACKGROUND_WORKERS', '2')),
+        ttl_seconds=float(os.getenv('JOB_TTL', '900'))
+    )
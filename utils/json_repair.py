@@ -0,0 +1,100 @@
+import re
+import json
+from typing import Any, List, Optional, Tuple
+
+_CODE_FENCE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$", re.IGNORECASE)
+
+def strip_code_fences(text: str) -> str:
+    """Remove a surrounding ```json ... ``` block, which models add despite instructions"""
+    return _CODE_FENCE.sub("", text or "")
+
+def strip_trailing_commas(text: str) -> str:
+    """Drop commas directly followed by a closing bracket, outside of strings"""
+    result = []
+    in_string = False
+    escaped = False
+    for index, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == ',':
+            following = text[index + 1:].lstrip()
+            if following[:1] in ('}', ']'):
+                continue
+        result.append(char)
+    return ''.join(result)
+
+def loads_lenient(text: str) -> Any:
+    """json.loads that accepts raw control characters in strings and trailing commas"""
+    try:
+        return json.loads(text, strict=False)
+    except json.JSONDecodeError:
+        return json.loads(strip_trailing_commas(text), strict=False)
+
+def close_truncated(text: str) -> Optional[Any]:
+    """
+    Parse JSON that was cut off mid-way (e.g. by max_tokens), keeping as much
+    as possible: the open string and brackets are closed, and if that is not
+    valid, the text is cut back to the last complete value at each level.
+    """
+    stack: List[str] = []
+    cuts: List[Tuple[int, List[str]]] = []
+    in_string = False
+    escaped = False
+
+    for index, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in '{[':
+            stack.append('}' if char == '{' else ']')
+            cuts.append((index + 1, list(stack)))
+        elif char in '}]':
+            if stack:
+                stack.pop()
+            cuts.append((index + 1, list(stack)))
+        elif char == ',':
+            cuts.append((index, list(stack)))
+
+    candidates = [text + ('"' if in_string else '') + ''.join(reversed(stack))]
+    candidates += [text[:index] + ''.join(reversed(open_brackets)) for index, open_brackets in reversed(cuts)]
+
+    for candidate in candidates:
+        try:
+            return loads_lenient(candidate)
+        except json.JSONDecodeError:
+            continue
+    return None
+
+def parse_json_object(text: str) -> Optional[dict]:
+    """
+    Extract the JSON object from an LLM response, tolerating surrounding
+    prose, code fences, trailing commas and truncation
+    """
+    text = strip_code_fences(text)
+    start = text.find('{')
+    if start == -1:
+        return None
+
+    end = text.rfind('}')
+    if end > start:
+        try:
+            value = loads_lenient(text[start:end + 1])
+            return value if isinstance(value, dict) else None
+        except json.JSONDecodeError:
+            pass
+
+    value = close_truncated(text[start:])
+    return value if isinstance(value, dict) else None
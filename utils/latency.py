@@ -0,0 +1,56 @@
+import threading
+from collections import deque
+from typing import Dict, Optional
+import streamlit as st
+
+class RollingPercentiles:
+    """Keep the last `size` samples and answer percentile queries over them"""
+
+    def __init__(self, size: int = 500):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, value: float) -> None:
+        with self._lock:
+            self._samples.append(value)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Nearest-rank percentile, q in [0, 100]; None when there are no samples"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        rank = max(int(round(q / 100 * len(samples))) - 1, 0)
+        return samples[min(rank, len(samples) - 1)]
+
+class LatencyTracker:
+    """Rolling latency samples per key, e.g. time to first byte per model"""
+
+    def __init__(self, size: int = 500):
+        self.size = size
+        self._windows: Dict[str, RollingPercentiles] = {}
+        self._lock = threading.Lock()
+
+    def window(self, key: str) -> RollingPercentiles:
+        with self._lock:
+            if key not in self._windows:
+                self._windows[key] = RollingPercentiles(self.size)
+            return self._windows[key]
+
+    def record(self, key: str, seconds: float) -> None:
+        self.window(key).add(seconds)
+
+    def percentile(self, key: str, q: float, min_samples: int = 1) -> Optional[float]:
+        """Percentile for this key, or None until min_samples have been recorded"""
+        window = self.window(key)
+        if len(window) < min_samples:
+            return None
+        return window.percentile(q)
+
+@st.cache_resource
+def get_ttfb_tracker():
+    """Get the process-wide time-to-first-byte tracker for upstream API calls"""
+    return LatencyTracker()
@@ -0,0 +1,112 @@
+import os
+import json
+import logging
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, TypeVar
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Model chains per task: a comma-separated list, tried in order, e.g.
+# GROQ_MODEL_GOALS="llama-3.1-8b-instant,llama-3.3-70b-versatile". Tasks without one use GROQ_MODEL.
+TASK_MODEL_ENV = {
+    "dietary_goals": "GROQ_MODEL_GOALS",
+    "goals_explanation": "GROQ_MODEL_GOALS",
+    "meal_recommendations": "GROQ_MODEL_RECIPES",
+    "recipe": "GROQ_MODEL_RECIPES"
+}
+
+# US dollars per million (input, output) tokens on Groq; GROQ_MODEL_PRICES
+# (a JSON object of the same shape) adds or overrides entries
+DEFAULT_PRICES = {
+    "llama-3.1-8b-instant": (0.05, 0.08),
+    "llama-3.3-70b-versatile": (0.59, 0.79),
+    "meta-llama/llama-4-scout-17b-16e-instruct": (0.11, 0.34),
+    "meta-llama/llama-4-maverick-17b-128e-instruct": (0.20, 0.60),
+    "gemma2-9b-it": (0.20, 0.20)
+}
+
+def _parse_chain(value: Optional[str]) -> List[str]:
+    models = []
+    for model in (value or "").split(","):
+        model = model.strip()
+        if model and model not in models:
+            models.append(model)
+    return models
+
+class ModelRouter:
+    """
+    Pick the model for each task, escalating along the task's chain when
+    a model's answer fails the caller's acceptance check
+    """
+
+    def __init__(self, default_model: Optional[str], task_models: Dict[str, List[str]], prices: Dict):
+        self.default_model = default_model
+        self.task_models = task_models
+        self.prices = prices
+        self._lock = threading.Lock()
+        self._escalations = defaultdict(int)
+
+    def chain(self, task: str) -> List[str]:
+        """Models to try for a task, in order"""
+        return self.task_models.get(task) or [self.default_model]
+
+    def cost(self, model: Optional[str], usage: Optional[Dict]) -> Optional[float]:
+        """US dollar cost of a call, or None for a model without a known price"""
+        if not usage or model not in self.prices:
+            return None
+        input_price, output_price = self.prices[model]
+        return ((usage.get('prompt_tokens') or 0) * input_price
+                + (usage.get('completion_tokens') or 0) * output_price) / 1e6
+
+    def run(self, task: str, call: Callable[[str], Optional[T]], accept: Callable[[T], bool]) -> Optional[T]:
+        """
+        Call each model of the task's chain until a result passes `accept`
+
+        Returns:
+            The first accepted result, else the last result that was not None
+        """
+        chain = self.chain(task)
+        result = None
+        for i, model in enumerate(chain):
+            candidate = call(model)
+            if candidate is not None:
+                result = candidate
+                if accept(candidate):
+                    return candidate
+            if i < len(chain) - 1:
+                with self._lock:
+                    self._escalations[(task, model)] += 1
+                logger.info(f"[ROUTER] {task}: escalating from {model} to {chain[i + 1]}")
+        return result
+
+    def record_escalation(self, task: str, model: str) -> None:
+        """Count an escalation made outside of run(), e.g. for a stream"""
+        with self._lock:
+            self._escalations[(task, model)] += 1
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            escalations = {f"{task}/{model}": count for (task, model), count in self._escalations.items()}
+        return {
+            "chains": {task: self.chain(task) for task in TASK_MODEL_ENV},
+            "escalations": escalations
+        }
+
+@st.cache_resource
+def get_model_router():
+    """Get the process-wide model router, configured from GROQ_MODEL, the per-task variables and GROQ_MODEL_PRICES"""
+    prices = dict(DEFAULT_PRICES)
+    try:
+        prices.update({model: tuple(price) for model, price in json.loads(os.getenv('GROQ_MODEL_PRICES', '{}')).items()})
+    except (ValueError, TypeError) as e:
+        logger.error(f"Ignoring GROQ_MODEL_PRICES: {e}")
+
+    return ModelRouter(
+        default_model=os.getenv('GROQ_MODEL'),
+        task_models={task: _parse_chain(os.getenv(variable)) for task, variable in TASK_MODEL_ENV.items()},
+        prices=prices
+    )
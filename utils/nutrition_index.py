@@ -0,0 +1,215 @@
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+import numpy as np
+from utils.recipes import Recipe
+
+# Allergies users write as a family, expanded to the ingredient words that belong to it
+ALLERGEN_FAMILIES = {
+    "nut": {"nut", "almond", "walnut", "cashew", "pecan", "hazelnut", "pistachio", "macadamia", "peanut", "pesto",
+            "praline", "marzipan", "nutella", "frangipane"},
+    "tree nut": {"nut", "almond", "walnut", "cashew", "pecan", "hazelnut", "pistachio", "macadamia", "pesto",
+                 "praline", "marzipan", "nutella", "frangipane"},
+    "peanut": {"peanut", "satay", "groundnut"},
+    "shellfish": {"shellfish", "shrimp", "prawn", "crab", "lobster", "mussel", "clam", "oyster", "scallop",
+                  "crayfish", "langoustine", "squid", "calamari", "octopus", "crustacean", "seafood"},
+    "fish": {"fish", "salmon", "tuna", "cod", "anchovy", "sardine", "mackerel", "trout", "haddock", "tilapia",
+             "halibut", "seabass", "bass", "pollock", "herring", "seafood", "worcestershire"},
+    "dairy": {"dairy", "milk", "cheese", "butter", "cream", "yogurt", "yoghurt", "feta", "mozzarella", "parmesan",
+              "ricotta", "ghee", "whey", "cheddar", "brie", "gouda", "halloumi", "paneer", "mascarpone", "kefir",
+              "buttermilk", "custard", "gruyere", "pecorino", "burrata", "bechamel", "alfredo", "tzatziki", "casein"},
+    "gluten": {"gluten", "wheat", "flour", "bread", "pasta", "barley", "rye", "couscous", "bulgur", "seitan",
+               "noodle", "breadcrumb", "panko", "tortilla", "spaghetti", "penne", "macaroni", "lasagna", "lasagne",
+               "fusilli", "linguine", "fettuccine", "orzo", "ramen", "udon", "semolina", "spelt", "farro", "pita",
+               "bun", "crouton", "cracker", "pastry", "pie", "cake", "biscuit", "cookie", "dumpling", "gnocchi",
+               "bagel", "baguette", "brioche", "naan", "pizza", "malt", "beer", "crumb"},
+    "egg": {"egg", "mayonnaise", "mayo", "meringue", "aioli", "omelette", "frittata", "custard", "quiche"},
+    "soy": {"soy", "soya", "soybean", "tofu", "tempeh", "edamame", "miso", "tamari"},
+    "sesame": {"sesame", "tahini", "hummus"}
+}
+
+# Other names users give an allergy, pointing at the families above
+_ALLERGY_ALIASES = {
+    "groundnut": ["peanut"],
+    "crustacean": ["shellfish"], "mollusc": ["shellfish"], "mollusk": ["shellfish"], "shrimp": ["shellfish"],
+    "seafood": ["fish", "shellfish"],
+    "milk": ["dairy"], "lactose": ["dairy"], "casein": ["dairy"], "cheese": ["dairy"],
+    "celiac": ["gluten"], "coeliac": ["gluten"], "wheat": ["gluten"],
+    "soya": ["soy"], "soybean": ["soy"]
+}
+
+# Words qualifying an allergy rather than naming it: "lactose intolerant", "allergic to nuts"
+_QUALIFIERS = {"allergy", "allergie", "allergic", "allergen", "intolerance", "intolerant", "sensitivity",
+               "sensitive", "disease", "free", "to", "severe", "mild", "i", "am", "have", "an", "a", "product"}
+
+_NO_ALLERGIES = {"", "none", "no", "nothing", "na", "n a"}
+
+def singular(word: str) -> str:
+    """Crude singular of an ingredient word: tomatoes -> tomato, peanuts -> peanut"""
+    if word.endswith("oes") or word.endswith("ches"):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith("ss") and len(word) > 3:
+        return word[:-1]
+    return word
+
+def _words(text: str) -> List[str]:
+    return [singular(word) for word in re.findall(r"[a-z]+", (text or "").lower())]
+
+def allergy_names(allergies: str) -> List[str]:
+    """
+    The allergies of an allergies field, each as its family name, or as
+    its own words when it is not a known family:
+    "Gluten intolerance, crustaceans and kiwis" -> ["gluten", "shellfish", "kiwi"]
+    """
+    names = set()
+    for allergy in re.split(r"[,;/\n]|\band\b|\bor\b", (allergies or "").lower()):
+        words = [word for word in _words(allergy) if word not in _QUALIFIERS]
+        allergy = " ".join(words)
+        if allergy in _NO_ALLERGIES:
+            continue
+        if allergy in ALLERGEN_FAMILIES:
+            names.add(allergy)
+        elif allergy in _ALLERGY_ALIASES:
+            names.update(_ALLERGY_ALIASES[allergy])
+        else:
+            # Unknown wording: keep it whole, and also match the families any of its words name
+            names.add(allergy)
+            for word in words:
+                names.update([word] if word in ALLERGEN_FAMILIES else _ALLERGY_ALIASES.get(word, []))
+    return sorted(names)
+
+def allergen_terms(allergies: str) -> Set[str]:
+    """Ingredient words to exclude for an allergies field such as "peanuts, shellfish" """
+    terms = set()
+    for name in allergy_names(allergies):
+        terms |= ALLERGEN_FAMILIES.get(name, set(name.split()))
+    return terms
+
+class _GroupView:
+    """One group's recipes as column arrays sorted by calories"""
+
+    def __init__(self, rows: np.ndarray, nutrition: np.ndarray):
+        order = np.argsort(nutrition[rows, 0], kind="stable")
+        self.rows = rows[order]
+        self.calories = np.ascontiguousarray(nutrition[self.rows, 0])
+        self.fiber = np.ascontiguousarray(nutrition[self.rows, 1])
+        self.protein = np.ascontiguousarray(nutrition[self.rows, 2])
+
+class _View:
+    """Immutable snapshot of the index that queries run against, rebuilt after additions"""
+
+    def __init__(self, size: int, nutrition: List, groups: List[int], postings: Dict[str, List[int]]):
+        nutrition = np.array(nutrition, dtype=float).reshape(size, 3)
+        groups = np.array(groups, dtype=np.int32)
+        all_rows = np.arange(size)
+        self.groups = {None: _GroupView(all_rows, nutrition)}
+        for group_id in np.unique(groups):
+            self.groups[int(group_id)] = _GroupView(all_rows[groups == group_id], nutrition)
+        self.size = size
+        self._postings = postings
+        self._word_masks: Dict[str, np.ndarray] = {}
+
+    def excluded(self, word: str) -> Optional[np.ndarray]:
+        """Rows containing the word, as a mask over all rows; built on first use"""
+        mask = self._word_masks.get(word)
+        if mask is None:
+            rows = self._postings.get(word)
+            if not rows:
+                return None
+            mask = np.zeros(self.size, dtype=bool)
+            mask[rows] = True
+            self._word_masks[word] = mask
+        return mask
+
+class NutritionIndex:
+    """
+    In-memory index of recipes by nutrition, for "top k recipes within
+    ±tolerance of these calories, fiber and protein, without these
+    allergens" queries.
+
+    Recipes are grouped (e.g. by dietary restrictions) and a query only
+    considers one group. Queries run on a snapshot holding each group's
+    nutrition columns sorted by calories: a binary search narrows them to
+    the calorie band, fiber and protein are filtered over that band only,
+    and an inverted index from ingredient and title words to recipes
+    drops the ones with allergens. The snapshot is rebuilt on the first
+    query after recipes were added.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._nutrition: List[float] = []
+        self._groups: List[int] = []
+        self._group_ids: Dict[str, int] = {}
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+        self._recipes: List[Recipe] = []
+        self._keys: Set[str] = set()
+        self._view: Optional[_View] = None
+
+    def __len__(self) -> int:
+        return len(self._recipes)
+
+    def add(self, recipe: Recipe, group: str = "", key: Optional[str] = None) -> bool:
+        """
+        Index a recipe; recipes missing a nutrition figure are skipped, as
+        are recipes with the `key` of one already indexed
+        """
+        if recipe.calories is None or recipe.fiber is None or recipe.protein is None:
+            return False
+        words = set(_words(recipe.title)).union(*map(_words, recipe.ingredients))
+        with self._lock:
+            if key is not None:
+                if key in self._keys:
+                    return False
+                self._keys.add(key)
+            row = len(self._recipes)
+            self._nutrition.extend((recipe.calories, recipe.fiber, recipe.protein))
+            self._groups.append(self._group_ids.setdefault(group, len(self._group_ids)))
+            for word in words:
+                self._postings[word].append(row)
+            self._recipes.append(recipe)
+            self._view = None
+        return True
+
+    def _current_view(self) -> _View:
+        with self._lock:
+            if self._view is None:
+                postings = {word: list(rows) for word, rows in self._postings.items()}
+                self._view = _View(len(self._recipes), self._nutrition, self._groups, postings)
+            return self._view
+
+    def query(self, calories: float, fiber: float, protein: float, tolerance: float = 0.2, k: int = 3,
+              group: Optional[str] = None, allergies: str = "") -> List[Recipe]:
+        """
+        Up to `k` recipes whose calories, fiber and protein are all within
+        ±tolerance of the targets, closest first (sum of relative deviations)
+
+        Args:
+            group (str): only consider recipes added with this group; None for all
+            allergies (str): a profile's allergies field, see allergen_terms
+        """
+        view = self._current_view()
+        part = view.groups.get(None if group is None else self._group_ids.get(group, -1))
+        if part is None or view.size == 0:
+            return []
+
+        lo = np.searchsorted(part.calories, calories * (1 - tolerance), side="left")
+        hi = np.searchsorted(part.calories, calories * (1 + tolerance), side="right")
+        fiber_deviation = np.abs(part.fiber[lo:hi] - fiber) / max(fiber, 1e-9)
+        protein_deviation = np.abs(part.protein[lo:hi] - protein) / max(protein, 1e-9)
+        candidates = (fiber_deviation <= tolerance) & (protein_deviation <= tolerance)
+        rows = part.rows[lo:hi]
+        for word in allergen_terms(allergies):
+            mask = view.excluded(word)
+            if mask is not None:
+                candidates &= ~mask[rows]
+
+        selected = np.flatnonzero(candidates)
+        scores = (np.abs(part.calories[lo:hi][selected] - calories) / max(calories, 1e-9)
+                  + fiber_deviation[selected] + protein_deviation[selected])
+        if len(selected) > k:
+            best = np.argpartition(scores, k)[:k]
+            selected, scores = selected[best], scores[best]
+        selected = selected[np.argsort(scores, kind="stable")]
+        return [self._recipes[row] for row in rows[selected]]
@@ -0,0 +1,81 @@
+from dataclasses import dataclass, field
+from typing import Dict, Mapping, Optional
+
+# Typed USERS columns, see migrations/002_users_typed_profile.sql
+PROFILE_COLUMNS = [
+    "USER_NAME", "AGE", "SEX", "WEIGHT", "HEIGHT", "RESTRICTIONS", "ALLERGIES", "PREFERENCES",
+    "GOAL_CALORIES", "GOAL_FIBER", "GOAL_PROTEIN"
+]
+
+GOAL_COLUMNS = ["GOAL_CALORIES", "GOAL_FIBER", "GOAL_PROTEIN"]
+
+@dataclass(frozen=True)
+class DietaryGoals:
+    """Daily targets: kCal, grams of fiber and grams of protein"""
+    calories: int
+    fiber: int
+    protein: int
+
+    @classmethod
+    def from_mapping(cls, goals: Optional[Mapping]) -> Optional["DietaryGoals"]:
+        """From {"calories": ..., "fiber": ..., "protein": ...}, e.g. a goals engine or LLM answer"""
+        try:
+            return cls(int(goals["calories"]), int(goals["fiber"]), int(goals["protein"]))
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def as_dict(self) -> Dict:
+        return {"calories": self.calories, "fiber": self.fiber, "protein": self.protein}
+
+def _text(value) -> str:
+    return "" if value is None else str(value)
+
+@dataclass(frozen=True)
+class UserProfile:
+    """
+    A user's profile, built once from its typed columns.
+
+    The prompt fragments are formatted when the profile is built, so
+    rendering and prompt building only read attributes.
+    """
+    user_name: str
+    age: Optional[float]
+    sex: Optional[str]
+    weight: Optional[float]
+    height: Optional[float]
+    restrictions: str = ""
+    allergies: str = ""
+    preferences: str = ""
+    goals: Optional[DietaryGoals] = None
+    # "Restrictions: ...\nAllergies: ...\nPreferences: ...", as the prompts have always received them
+    restrictions_text: str = field(init=False, repr=False, compare=False)
+    # Daily goals split per meal, or "Not set"
+    goals_text: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "restrictions_text", (
+            f"Restrictions: {self.restrictions}\nAllergies: {self.allergies}\nPreferences: {self.preferences}"
+        ))
+        goals = self.goals
+        object.__setattr__(self, "goals_text", "Not set" if goals is None else f"""
+            Calories: {goals.calories} kCal/day ({round(goals.calories / 3)} kCal per meal)
+            Fiber: {goals.fiber} g/day ({round(goals.fiber / 3)} grams per meal)
+            Protein: {goals.protein} g/day ({round(goals.protein / 3)} grams per meal)
+            """)
+
+    @classmethod
+    def from_row(cls, row: Dict) -> "UserProfile":
+        """From a USERS row with the PROFILE_COLUMNS"""
+        goal_values = [row.get(column) for column in GOAL_COLUMNS]
+        goals = None if any(value is None for value in goal_values) else DietaryGoals(*map(int, goal_values))
+        return cls(
+            user_name=row.get("USER_NAME"),
+            age=row.get("AGE"),
+            sex=row.get("SEX"),
+            weight=row.get("WEIGHT"),
+            height=row.get("HEIGHT"),
+            restrictions=_text(row.get("RESTRICTIONS")),
+            allergies=_text(row.get("ALLERGIES")),
+            preferences=_text(row.get("PREFERENCES")),
+            goals=goals
+        )
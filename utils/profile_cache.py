@@ -0,0 +1,80 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+import streamlit as st
+from utils.profile import UserProfile
+from utils.single_flight import get_single_flight
+
+class ProfileCache:
+    """
+    Process-wide cache of user profiles by user name, with TTL expiry.
+
+    Writers keep it current: put() after writing a profile, invalidate()
+    when the new value is not at hand.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_name: str) -> Optional[UserProfile]:
+        with self._lock:
+            entry = self._entries.get(user_name)
+            if entry is None or time.monotonic() - entry[1] > self.ttl_seconds:
+                self._entries.pop(user_name, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_name)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, profile: UserProfile) -> None:
+        with self._lock:
+            self._entries[profile.user_name] = (profile, time.monotonic())
+            self._entries.move_to_end(profile.user_name)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_name: str) -> None:
+        with self._lock:
+            self._entries.pop(user_name, None)
+
+    def get_or_load(self, user_name: str, loader: Callable[[str], Optional[UserProfile]]) -> Optional[UserProfile]:
+        """Cached profile, or load it once for all concurrent callers and cache it"""
+        profile = self.get(user_name)
+        if profile is not None:
+            return profile
+        profile, _ = get_single_flight().do(f"profile:{user_name}", lambda: loader(user_name))
+        if profile is not None:
+            self.put(profile)
+        return profile
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+@st.cache_resource
+def get_profile_cache():
+    """Get the process-wide profile cache, sized by PROFILE_CACHE_SIZE and PROFILE_CACHE_TTL (seconds)"""
+    return ProfileCache(
+        max_entries=int(os.getenv('PROFILE_CACHE_SIZE', '10000')),
+        ttl_seconds=float(os.getenv('PROFILE_CACHE_TTL', '300'))
+    )
+
+def _load_user_profile(user_name: str) -> Optional[UserProfile]:
+    # Imported here so the cache itself does not depend on Snowpark
+    from utils.database import load_user_profile
+    return load_user_profile(user_name)
+
+def current_user_profile() -> Optional[UserProfile]:
+    """The logged-in user's profile, read through the profile cache"""
+    user_name = st.session_state.get('user_name')
+    if not user_name:
+        return None
+    return get_profile_cache().get_or_load(user_name, _load_user_profile)
@@ -0,0 +1,231 @@
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, List
+
+# Prompt layout for recipe generation, set by GROQ_PROMPT_MODE:
+# - "full": instructions, JSON structure and a worked example, all in the user message
+# - "compact": JSON structure only, no example
+# - "cached_prefix": same content as "full", but everything static goes in the system
+#   message, so consecutive requests share an identical prefix the provider can cache
+PROMPT_MODES = ("full", "compact", "cached_prefix")
+PROMPT_MODE = os.getenv('GROQ_PROMPT_MODE', 'full').lower()
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+def estimate_tokens(text: str) -> int:
+    """
+    Approximate the number of tokens in a text: one per word or punctuation
+    mark, plus one per extra 4 characters of long words, which BPE splits
+    """
+    count = 0
+    for piece in _TOKEN_PATTERN.findall(text or ""):
+        count += 1 + max(len(piece) - 4, 0) // 4
+    return count
+
+SYSTEM_PROMPT = "You are a helpful assistant for nutrition and cooking."
+
+MEAL_FORMAT = """Format your response as a JSON object with the following structure:
+{
+    "recipe 1" : {
+        "title": "<the recipe's name>",
+        "instructions": "<instructions of the recipe>",
+        "time": "<estimated preparation time in minutes>",
+        "ingredients": [
+            "<ingredient 1 (with quantity)>",
+            "<ingredient 2 (with quantity)>",
+            etc.
+        ],
+        "calories": <number, estimated amount of calories>,
+        "fiber": <number, estimated amount of fiber>,
+        "protein": <number, estimated amount of protein>
+    },
+    "recipe 2" : {
+        follow the same structure as recipe 1
+    },
+    "recipe 3" : {
+        follow the same structure as recipe 1
+    }
+}"""
+
+MEAL_FORMAT_COMPACT = """Respond with JSON only, as {"recipe 1": R, "recipe 2": R, "recipe 3": R} where R is
+{"title": string, "instructions": string, "time": minutes, "ingredients": [string with quantity], "calories": number, "fiber": number, "protein": number}"""
+
+MEAL_EXAMPLE = """Here is an example:
+{
+    "recipe 1": {
+        "title": "Classic Gazpacho",
+        "instructions": "1. Combine all ingredients in a blender.\n2. Blend until smooth.\n3. Strain the mixture through a fine-mesh sieve into a large bowl, pressing on the solids to extract as much liquid as possible.\n4. Discard the solids and chill the soup in the refrigerator for at least 2 hours.\n5. Serve cold, garnished with diced cucumber, bell pepper, and croutons if desired.",
+        "time": 20,
+        "ingredients": [
+            "1.5 kg tomatoes",
+            "1 cucumber",
+            "1 red bell pepper",
+            "1 small red onion",
+            "2 cloves garlic",
+            "500 ml tomato juice",
+            "120 ml extra-virgin olive oil",
+            "30 ml red wine vinegar",
+            "Salt and pepper"
+        ],
+        "calories": 500,
+        "fiber": 10,
+        "protein": 20
+    },
+    "recipe 2": {
+        "title": "Caprese Salad",
+        "instructions": "1. Slice the tomatoes and mozzarella into 1/4-inch thick slices.\n2. Arrange the tomato and mozzarella slices alternately on a platter.\n3. Drizzle with olive oil and balsamic glaze.\n4. Sprinkle with salt and pepper to taste.\n5. Garnish with fresh basil leaves.\n6. Serve immediately.",
+        "time": 15,
+        "ingredients": [
+            "4 large  tomatoes",
+            "250 g fresh mozzarella cheese",
+            "1/4 cup fresh basil leaves",
+            "2 tbsp extra-virgin olive oil",
+            "2 tbsp balsamic glaze",
+            "Salt and pepper"
+        ],
+        "calories": 450,
+        "fiber": 12,
+        "protein": 18
+    },
+    "recipe 3": {
+        "title": "Chicken Caesar Salad",
+        "instructions": "1. In a large bowl, combine the chopped romaine lettuce, grilled chicken breast, croutons, and shredded Parmesan cheese.\n2. In a small bowl, whisk together the Caesar dressing and lemon juice.\n3. Pour the dressing over the salad and toss to coat evenly.\n4. Season with salt and pepper to taste.\n5. Serve immediately.",
+        "time": 20,
+        "ingredients": [
+            "1 head romaine lettuce",
+            "2 chicken breasts",
+            "2 cups croutons",
+            "1/2 cup shredded Parmesan cheese",
+            "1/2 cup Caesar dressing",
+            "1 tbsp lemon juice",
+            "Salt and pepper"
+        ],
+        "calories": 520,
+        "fiber": 12,
+        "protein": 25
+    }
+}"""
+
+MEAL_RULES = """Try to give varied recipes. Do not add styling, markdown or line breaks inside the instructions.
+The recipes need to be JSON-safe, this is important !"""
+
+RECIPE_FORMAT = """Format your response as a JSON object with the following structure:
+{
+    "title": "<the recipe's name>",
+    "instructions": "<instructions of the recipe>",
+    "time": "<estimated preparation time in minutes>",
+    "ingredients": [
+        "<ingredient 1 (with quantity)>",
+        "<ingredient 2 (with quantity)>",
+        etc.
+    ],
+    "calories": <number, estimated amount of calories>,
+    "fiber": <number, estimated amount of fiber>,
+    "protein": <number, estimated amount of protein>
+}"""
+
+RECIPE_FORMAT_COMPACT = """Respond with JSON only, as
+{"title": string, "instructions": string, "time": minutes, "ingredients": [string with quantity], "calories": number, "fiber": number, "protein": number}"""
+
+RECIPE_EXAMPLE = """Here is an example:
+{
+    "title": "Classic Gazpacho",
+    "instructions": "1. Combine all ingredients in a blender. 2. Blend until smooth. 3. Chill the soup in the refrigerator for at least 2 hours. 4. Serve cold, garnished with diced cucumber.",
+    "time": 20,
+    "ingredients": [
+        "1.5 kg tomatoes",
+        "1 cucumber",
+        "1 red bell pepper",
+        "2 cloves garlic",
+        "120 ml extra-virgin olive oil",
+        "Salt and pepper"
+    ],
+    "calories": 500,
+    "fiber": 10,
+    "protein": 20
+}"""
+
+RECIPE_RULES = """Do not add styling, markdown or line breaks inside the instructions.
+The recipe needs to be JSON-safe, this is important !"""
+
+@dataclass
+class PromptSection:
+    name: str
+    text: str
+    role: str = "user"
+
+class PromptBuilder:
+    """Assemble chat messages from named sections, and measure each section in tokens"""
+
+    def __init__(self):
+        self.sections: List[PromptSection] = []
+
+    def add(self, name: str, text: str, role: str = "user") -> "PromptBuilder":
+        self.sections.append(PromptSection(name, text.strip("\n"), role))
+        return self
+
+    def messages(self) -> List[Dict]:
+        """Chat messages: the system sections, then the user sections, each joined by blank lines"""
+        messages = []
+        for role in ("system", "user"):
+            texts = [section.text for section in self.sections if section.role == role]
+            if texts:
+                messages.append({"role": role, "content": "\n\n".join(texts)})
+        return messages
+
+    def token_report(self) -> Dict[str, int]:
+        """Estimated tokens per section, and in total"""
+        report = {section.name: estimate_tokens(section.text) for section in self.sections}
+        report["total"] = sum(report.values())
+        return report
+
+def _static_sections(builder: PromptBuilder, mode: str, format_text: str, compact_format_text: str,
+                     example_text: str, rules_text: str) -> None:
+    role = "system" if mode == "cached_prefix" else "user"
+    if mode == "compact":
+        builder.add("format", compact_format_text, role)
+        builder.add("rules", rules_text, role)
+        return
+    builder.add("format", format_text, role)
+    builder.add("example", f"---\n\n{example_text}\n\n---", role)
+    builder.add("rules", rules_text, role)
+
+def build_meal_prompt(restrictions: str, meal_preferences: str, goals_str: str,
+                      mode: str = PROMPT_MODE) -> PromptBuilder:
+    """Prompt asking for 3 recipes matching the user's profile"""
+    if mode not in PROMPT_MODES:
+        raise ValueError(f"Unknown prompt mode: {mode}")
+
+    builder = PromptBuilder().add("system", SYSTEM_PROMPT, "system")
+    if mode == "cached_prefix":
+        _static_sections(builder, mode, MEAL_FORMAT, MEAL_FORMAT_COMPACT, MEAL_EXAMPLE, MEAL_RULES)
+
+    builder.add("constraints", f"""Please generate 3 recipes, with the following constraints:
+- The client has the following dietary and preferences: {restrictions}
+- The client has given the following instructions for today: {meal_preferences}
+- Dietary Goals: {goals_str}""")
+
+    if mode != "cached_prefix":
+        _static_sections(builder, mode, MEAL_FORMAT, MEAL_FORMAT_COMPACT, MEAL_EXAMPLE, MEAL_RULES)
+    return builder
+
+def build_recipe_prompt(restrictions: str, meal_preferences: str, goals_str: str, diversity_hint: str,
+                        mode: str = PROMPT_MODE) -> PromptBuilder:
+    """Prompt asking for a single recipe, steered by a diversity hint"""
+    if mode not in PROMPT_MODES:
+        raise ValueError(f"Unknown prompt mode: {mode}")
+
+    builder = PromptBuilder().add("system", SYSTEM_PROMPT, "system")
+    if mode == "cached_prefix":
+        _static_sections(builder, mode, RECIPE_FORMAT, RECIPE_FORMAT_COMPACT, RECIPE_EXAMPLE, RECIPE_RULES)
+
+    builder.add("constraints", f"""Please generate 1 recipe, with the following constraints:
+- The client has the following dietary and preferences: {restrictions}
+- The client has given the following instructions for today: {meal_preferences}
+- Dietary Goals: {goals_str}
+- This recipe is one of several suggestions, so make it {diversity_hint}.""")
+
+    if mode != "cached_prefix":
+        _static_sections(builder, mode, RECIPE_FORMAT, RECIPE_FORMAT_COMPACT, RECIPE_EXAMPLE, RECIPE_RULES)
+    return builder
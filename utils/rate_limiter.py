@@ -0,0 +1,147 @@
+import os
+import time
+import heapq
+import itertools
+import threading
+from typing import Dict, Optional
+import streamlit as st
+from utils.prompts import estimate_tokens
+
+# Lower values are served first
+INTERACTIVE = 0
+BACKGROUND = 10
+
+def estimate_request_tokens(payload: Dict) -> int:
+    """Rough upper bound of the tokens a chat request will use: estimated prompt tokens plus max_tokens"""
+    prompt_tokens = sum(estimate_tokens(message.get("content") or "") for message in payload.get("messages", []))
+    return prompt_tokens + int(payload.get("max_tokens") or 0)
+
+class TokenBucket:
+    """Classic token bucket; the level may go negative when usage is reconciled after the fact"""
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.refill_per_second)
+        self.updated = now
+
+    def time_until(self, amount: float, now: float) -> float:
+        """Seconds until `amount` can be consumed (requests larger than the bucket only need a full bucket)"""
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return max(missing, 0) / self.refill_per_second
+
+    def consume(self, amount: float) -> None:
+        self.level -= amount
+
+    def limit_to(self, level: float, now: float) -> None:
+        """Lower the level to what the provider reports as remaining"""
+        self._refill(now)
+        self.level = min(self.level, level)
+
+class RateLimiter:
+    """
+    Client-side limiter for the provider's requests-per-minute and
+    tokens-per-minute quotas.
+
+    Callers wait in a priority queue, so interactive requests are admitted
+    before background work; within a priority, callers are served in order.
+    A limit of 0 disables that bucket.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60) if tokens_per_minute else None
+        self._changed = threading.Condition()
+        self._queue = []
+        self._sequence = itertools.count()
+        self._paused_until = 0.0
+
+    def _wait_time(self, estimated_tokens: int, now: float) -> float:
+        wait = self._paused_until - now
+        if self.requests is not None:
+            wait = max(wait, self.requests.time_until(1, now))
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.time_until(estimated_tokens, now))
+        return wait
+
+    def acquire(self, estimated_tokens: int, priority: int = INTERACTIVE, timeout: Optional[float] = None) -> bool:
+        """
+        Block until the request fits in both budgets and no higher-priority caller is waiting
+
+        Returns:
+            bool: False if the timeout expired before the request was admitted
+        """
+        ticket = (priority, next(self._sequence))
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        with self._changed:
+            heapq.heappush(self._queue, ticket)
+            while True:
+                now = time.monotonic()
+                wait = None
+                if self._queue[0] == ticket:
+                    wait = self._wait_time(estimated_tokens, now)
+                    if wait <= 0:
+                        heapq.heappop(self._queue)
+                        if self.requests is not None:
+                            self.requests.consume(1)
+                        if self.tokens is not None:
+                            self.tokens.consume(estimated_tokens)
+                        self._changed.notify_all()
+                        return True
+
+                if deadline is not None:
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._queue.remove(ticket)
+                        heapq.heapify(self._queue)
+                        self._changed.notify_all()
+                        return False
+                    wait = remaining if wait is None else min(wait, remaining)
+
+                self._changed.wait(wait)
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: Optional[int]) -> None:
+        """Refund (or charge) the difference between the estimate and the reported usage"""
+        if self.tokens is None or actual_tokens is None:
+            return
+        with self._changed:
+            self.tokens.consume(actual_tokens - estimated_tokens)
+            self._changed.notify_all()
+
+    def update_from_headers(self, headers) -> None:
+        """Align the buckets with the provider's x-ratelimit-remaining-* response headers"""
+        with self._changed:
+            now = time.monotonic()
+            for bucket, header in ((self.requests, 'x-ratelimit-remaining-requests'),
+                                   (self.tokens, 'x-ratelimit-remaining-tokens')):
+                value = headers.get(header)
+                if bucket is None or value is None:
+                    continue
+                try:
+                    bucket.limit_to(float(value), now)
+                except ValueError:
+                    pass
+
+    def pause(self, seconds: float) -> None:
+        """Hold all requests for a while, e.g. after a 429 with a Retry-After header"""
+        with self._changed:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._changed.notify_all()
+
+@st.cache_resource
+def get_rate_limiter():
+    """
+    Get the process-wide limiter for Groq requests, sized by GROQ_RPM
+    and GROQ_TPM, the requests and tokens per minute of the account's tier
+    (default 0: no client-side limit)
+    """
+    return RateLimiter(
+        requests_per_minute=int(os.getenv('GROQ_RPM', '0')),
+        tokens_per_minute=int(os.getenv('GROQ_TPM', '0'))
+    )
@@ -0,0 +1,355 @@
+import os
+import re
+import json
+import time
+import random
+import sqlite3
+import logging
+import tempfile
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, FrozenSet, List, Optional, Sequence
+import streamlit as st
+from utils.nutrition_index import NutritionIndex, allergy_names, singular
+from utils.recipes import Recipe
+from utils.response_cache import is_generic_preference, normalize_preferences
+
+logger = logging.getLogger(__name__)
+
+# Stored recipes whose ingredient sets overlap at least this much (Jaccard) count as the same recipe
+DEDUP_SIMILARITY = float(os.getenv('RECIPE_DEDUP_SIMILARITY', '0.8'))
+
+# A stored recipe matches a profile when its calories, fiber and protein are all within
+# this fraction of the per-meal goals
+MATCH_TOLERANCE = float(os.getenv('RECIPE_MATCH_TOLERANCE', '0.2'))
+
+# Seconds between reloads of the nutrition index, to pick up recipes stored by other processes
+INDEX_REFRESH = float(os.getenv('RECIPE_INDEX_REFRESH', '300'))
+
+# RECIPE_RETRIEVAL=false keeps storing recipes but always generates new ones
+RETRIEVAL_ENABLED = os.getenv('RECIPE_RETRIEVAL', 'true').lower() == 'true'
+
+# Recipes are drawn at random among the RECIPE_RETRIEVAL_POOL x count closest matches, skipping the last
+# RECIPE_RECENTLY_SERVED ones served to the user; when too few are left, new recipes are generated
+RETRIEVAL_POOL = int(os.getenv('RECIPE_RETRIEVAL_POOL', '5'))
+RECENTLY_SERVED = int(os.getenv('RECIPE_RECENTLY_SERVED', '12'))
+
+# Users whose recently served recipes are remembered, least recently served forgotten first
+_SERVED_USERS = 10000
+
+_TITLE_STOPWORDS = {"a", "an", "and", "the", "with", "of", "in", "on", "style", "easy", "quick", "simple"}
+
+_QUANTITY = re.compile(
+    r"\b(\d+([.,/]\d+)?|½|¼|¾|a|an|kg|g|mg|ml|cl|dl|l|oz|lb|lbs|cups?|tbsp|tsp|tablespoons?|teaspoons?|"
+    r"pinch(es)?|cloves?|slices?|cans?|handful|bunch|large|medium|small|fresh|chopped|diced|sliced|minced|of|to|taste)\b"
+)
+
+# Values of RESTRICTIONS meaning there are none
+_NO_RESTRICTIONS = {"", "none", "no", "nothing", "n a", "na"}
+
+def title_key(title: str) -> str:
+    """Order-insensitive title without filler words, e.g. "Quick Chickpea and Spinach Curry" -> "chickpea curry spinach" """
+    words = set(re.findall(r"[a-z]+", (title or "").lower())) - _TITLE_STOPWORDS
+    return " ".join(sorted(words))
+
+def ingredient_name(ingredient: str) -> str:
+    """The ingredient without quantity, unit or preparation: "1.5 kg tomatoes, peeled" -> "tomato" """
+    text = re.sub(r"\(.*?\)", " ", (ingredient or "").lower()).split(",")[0]
+    text = _QUANTITY.sub(" ", text)
+    return " ".join(singular(word) for word in re.findall(r"[a-z]+", text))
+
+def ingredient_set(recipe: Recipe) -> FrozenSet[str]:
+    return frozenset(name for name in map(ingredient_name, recipe.ingredients) if name)
+
+def diet_key(profile) -> str:
+    """
+    "<restrictions>|<allergies>" of the profile a recipe was generated for,
+    the restrictions as sorted words and the allergies as sorted allergy
+    names (see allergy_names); recipes are only deduplicated among and
+    served to profiles with the same key
+    """
+    restrictions = normalize_preferences(profile.restrictions)
+    restrictions = "" if restrictions in _NO_RESTRICTIONS else " ".join(sorted(set(restrictions.split())))
+    return f"{restrictions}|{','.join(allergy_names(profile.allergies))}"
+
+def _similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS {table} (
+    DIET_KEY VARCHAR NOT NULL,
+    TITLE VARCHAR NOT NULL,
+    TITLE_KEY VARCHAR NOT NULL,
+    INGREDIENTS_KEY VARCHAR NOT NULL,
+    RECIPE_JSON VARCHAR NOT NULL,
+    CALORIES FLOAT NOT NULL,
+    FIBER FLOAT,
+    PROTEIN FLOAT,
+    CREATED_AT FLOAT NOT NULL
+)
+"""
+
+class SQLiteRecipeBackend:
+    """Local SQLite file, one connection shared between threads behind a lock"""
+
+    table = "recipes"
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(CREATE_TABLE.format(table=self.table))
+            self._connection.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.table}_diet_calories ON {self.table} (DIET_KEY, CALORIES)"
+            )
+
+    def fetch(self, query: str, params: Sequence) -> List[tuple]:
+        with self._lock:
+            return self._connection.execute(query, tuple(params)).fetchall()
+
+    def execute(self, query: str, params: Sequence) -> None:
+        with self._lock, self._connection:
+            self._connection.execute(query, tuple(params))
+
+class SnowflakeRecipeBackend:
+    """HACKATON.USERS_DATA.RECIPES, see migrations/003_recipes.sql"""
+
+    table = "HACKATON.USERS_DATA.RECIPES"
+
+    def fetch(self, query: str, params: Sequence) -> List[tuple]:
+        from utils.snowflake_session import get_session_manager
+        with get_session_manager().session() as session:
+            return [tuple(row) for row in session.sql(query, params=list(params)).collect()]
+
+    def execute(self, query: str, params: Sequence) -> None:
+        self.fetch(query, params)
+
+def _index_key(diet: str, key: str) -> str:
+    return f"{diet}\n{key}"
+
+class RecipeStore:
+    """
+    Generated recipes with their nutrition figures, deduplicated, and
+    retrieved by how well they fit a profile's per-meal goals.
+
+    A recipe is a duplicate of a stored one for the same diet_key when
+    their titles match after normalization (see title_key) or their
+    ingredient sets overlap by `similarity` or more. Retrieval goes through
+    a NutritionIndex of all stored recipes, rebuilt in the background.
+    """
+
+    def __init__(self, backend, similarity: float = DEDUP_SIMILARITY, tolerance: float = MATCH_TOLERANCE):
+        self.backend = backend
+        self.table = backend.table
+        self.similarity = similarity
+        self.tolerance = tolerance
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        # Stores generated recipes off the generation path, one call at a time
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="recipe-store")
+        self._index: Optional[NutritionIndex] = None
+        self._index_loaded_at = 0.0
+        self._rebuilding = False
+        # Recipes added while the index is rebuilt, appended to the new one before it is swapped in
+        self._added_during_rebuild = []
+        # user_name -> title keys of the recipes last served to them
+        self._served: "OrderedDict[str, deque]" = OrderedDict()
+        self._counts = {"added": 0, "duplicates": 0, "hits": 0, "misses": 0}
+
+    def _duplicates(self, diet: str, candidates: List) -> List[bool]:
+        """Whether each (recipe, title key, ingredient set) duplicates a stored recipe or an earlier candidate"""
+        # Near-identical recipes have close calories, which bounds the stored rows to compare
+        calories = [recipe.calories for recipe, _, _ in candidates]
+        rows = self.backend.fetch(
+            f"SELECT TITLE_KEY, INGREDIENTS_KEY, CALORIES FROM {self.table} "
+            f"WHERE DIET_KEY = ? AND (TITLE_KEY IN ({', '.join('?' for _ in candidates)}) OR CALORIES BETWEEN ? AND ?)",
+            [diet, *(key for _, key, _ in candidates),
+             min(calories) * (1 - self.tolerance), max(calories) * (1 + self.tolerance)]
+        )
+        kept = [(title, frozenset(filter(None, ingredients.split("|"))), stored_calories)
+                for title, ingredients, stored_calories in rows]
+
+        duplicates = []
+        for recipe, key, ingredients in candidates:
+            low, high = recipe.calories * (1 - self.tolerance), recipe.calories * (1 + self.tolerance)
+            duplicate = any(
+                title == key or (low <= stored_calories <= high and _similarity(ingredients, stored) >= self.similarity)
+                for title, stored, stored_calories in kept
+            )
+            duplicates.append(duplicate)
+            if not duplicate:
+                kept.append((key, ingredients, recipe.calories))
+        return duplicates
+
+    def add(self, recipes: List[Recipe], profile) -> int:
+        """
+        Store the complete recipes that are not duplicates, with one query
+        for the duplicate check and one INSERT
+
+        Returns:
+            int: number of recipes stored
+        """
+        diet = diet_key(profile)
+        candidates = [
+            (recipe, title_key(recipe.title), ingredient_set(recipe)) for recipe in recipes
+            if recipe.complete and recipe.calories is not None and recipe.ingredients
+        ]
+        if not candidates:
+            return 0
+
+        # Serialized so concurrent generations of the same recipe do not both get in
+        with self._write_lock:
+            duplicates = self._duplicates(diet, candidates)
+            new = [candidate for candidate, duplicate in zip(candidates, duplicates) if not duplicate]
+            if new:
+                now = time.time()
+                self.backend.execute(
+                    f"INSERT INTO {self.table} (DIET_KEY, TITLE, TITLE_KEY, INGREDIENTS_KEY, RECIPE_JSON, "
+                    f"CALORIES, FIBER, PROTEIN, CREATED_AT) VALUES "
+                    + ", ".join("(?, ?, ?, ?, ?, ?, ?, ?, ?)" for _ in new),
+                    [value for recipe, key, ingredients in new for value in (
+                        diet, recipe.title, key, "|".join(sorted(ingredients)), json.dumps(recipe.to_dict()),
+                        recipe.calories, recipe.fiber, recipe.protein, now
+                    )]
+                )
+
+        with self._lock:
+            self._counts["added"] += len(new)
+            self._counts["duplicates"] += len(candidates) - len(new)
+            index = self._index
+            if self._rebuilding:
+                self._added_during_rebuild.extend((recipe, diet, key) for recipe, key, _ in new)
+        if index is not None:
+            for recipe, key, _ in new:
+                index.add(recipe, diet, _index_key(diet, key))
+        return len(new)
+
+    def _load_index(self) -> None:
+        """Build a new nutrition index from the table and swap it in"""
+        loaded = NutritionIndex()
+        try:
+            for diet, key, recipe_json in self.backend.fetch(
+                    f"SELECT DIET_KEY, TITLE_KEY, RECIPE_JSON FROM {self.table}", []):
+                recipe = Recipe.from_dict(json.loads(recipe_json))
+                if recipe is not None:
+                    loaded.add(recipe, diet, _index_key(diet, key))
+        except Exception as e:
+            logger.error(f"[RECIPES] Could not load the nutrition index: {e}")
+            with self._lock:
+                # Retried after INDEX_REFRESH, on the current index meanwhile
+                self._index_loaded_at = time.monotonic()
+                self._rebuilding = False
+                self._added_during_rebuild = []
+            return
+
+        with self._lock:
+            for recipe, diet, key in self._added_during_rebuild:
+                loaded.add(recipe, diet, _index_key(diet, key))
+            self._index = loaded
+            self._index_loaded_at = time.monotonic()
+            self._rebuilding = False
+            self._added_during_rebuild = []
+        logger.info(f"[RECIPES] Indexed {len(loaded)} recipes")
+
+    def nutrition_index(self) -> Optional[NutritionIndex]:
+        """
+        The nutrition index of all stored recipes, or None before it was
+        first loaded. It is loaded in the background on first use and every
+        INDEX_REFRESH seconds, to pick up recipes stored by other processes;
+        callers keep using the current one meanwhile.
+        """
+        with self._lock:
+            index = self._index
+            stale = time.monotonic() - self._index_loaded_at >= INDEX_REFRESH
+            if (index is None or stale) and not self._rebuilding:
+                self._rebuilding = True
+                self._added_during_rebuild = []
+                threading.Thread(target=self._load_index, name="recipe-index", daemon=True).start()
+        return index
+
+    def find(self, profile, count: int = 3) -> List[Recipe]:
+        """
+        `count` stored recipes drawn at random among the closest to the
+        profile's per-meal goals, among those stored for the same diet_key
+        and not recently served to this user; an empty list if fewer than
+        `count` such recipes are within the tolerance (or the index is not
+        loaded yet), so new ones get generated. Recipes naming one of its
+        allergens are left out even then, in case one slipped past the model.
+        """
+        goals = profile.goals
+        index = self.nutrition_index()
+        if goals is None or index is None:
+            return []
+        with self._lock:
+            served = set(self._served.get(profile.user_name, ()))
+        matches = index.query(
+            goals.calories / 3, goals.fiber / 3, goals.protein / 3, tolerance=self.tolerance,
+            k=count * RETRIEVAL_POOL + len(served), group=diet_key(profile), allergies=profile.allergies
+        )
+        fresh = [recipe for recipe in matches if title_key(recipe.title) not in served]
+        recipes = random.sample(fresh, count) if len(fresh) >= count else []
+
+        with self._lock:
+            self._counts["hits" if recipes else "misses"] += 1
+            if recipes:
+                recent = self._served.pop(profile.user_name, None) or deque(maxlen=RECENTLY_SERVED)
+                recent.extend(title_key(recipe.title) for recipe in recipes)
+                self._served[profile.user_name] = recent
+                while len(self._served) > _SERVED_USERS:
+                    self._served.popitem(last=False)
+        return recipes
+
+    def retrieve(self, profile, meal_preferences: str, count: int = 3) -> List[Recipe]:
+        """
+        Stored recipes answering a meal request, when it asks for nothing in
+        particular; specific requests are left to the model
+        """
+        if not RETRIEVAL_ENABLED or not is_generic_preference(meal_preferences):
+            return []
+        try:
+            return self.find(profile, count)
+        except Exception as e:
+            logger.error(f"[RECIPES] Retrieval failed: {e}")
+            return []
+
+    def _remember(self, recipes: List[Recipe], profile) -> None:
+        try:
+            added = self.add(recipes, profile)
+            logger.info(f"[RECIPES] Stored {added} of {len(recipes)} recipes")
+        except Exception as e:
+            logger.error(f"[RECIPES] Could not store recipes: {e}")
+
+    def remember(self, recipes: List[Recipe], profile) -> Future:
+        """
+        add() for the generation paths: stores the recipes on the store's
+        writer thread, so the request neither waits for nor fails with it
+        """
+        return self._writer.submit(self._remember, list(recipes), profile)
+
+    def count(self) -> int:
+        return self.backend.fetch(f"SELECT COUNT(*) FROM {self.table}", [])[0][0]
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._counts)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else None
+        return stats
+
+@st.cache_resource
+def get_recipe_store() -> Optional[RecipeStore]:
+    """
+    Get the process-wide recipe store selected by RECIPE_STORE: "sqlite"
+    (default, at RECIPE_STORE_PATH, in the system temp directory unless set),
+    "snowflake", or "off" (returns None)
+    """
+    kind = os.getenv('RECIPE_STORE', 'sqlite').lower()
+    if kind == "off":
+        return None
+    if kind == "snowflake":
+        return RecipeStore(SnowflakeRecipeBackend())
+    if kind != "sqlite":
+        raise ValueError(f"Unknown recipe store: {kind}")
+    path = os.getenv('RECIPE_STORE_PATH', os.path.join(tempfile.gettempdir(), 'recipes.sqlite'))
+    return RecipeStore(SQLiteRecipeBackend(path))
@@ -0,0 +1,187 @@
+import re
+import json
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Optional
+from utils.json_repair import close_truncated, loads_lenient, parse_json_object, strip_code_fences
+
+RECIPE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string"},
+        "instructions": {"type": "string"},
+        "time": {"type": "number"},
+        "ingredients": {"type": "array", "items": {"type": "string"}},
+        "calories": {"type": "number"},
+        "fiber": {"type": "number"},
+        "protein": {"type": "number"}
+    },
+    "required": ["title", "instructions", "time", "ingredients", "calories", "fiber", "protein"],
+    "additionalProperties": False
+}
+
+def recipes_schema(count: int = 3) -> Dict:
+    """Schema of the {"recipe 1": {...}, "recipe 2": {...}} response"""
+    keys = [f"recipe {i + 1}" for i in range(count)]
+    return {
+        "type": "object",
+        "properties": {key: RECIPE_SCHEMA for key in keys},
+        "required": keys,
+        "additionalProperties": False
+    }
+
+def _number(value) -> Optional[float]:
+    """Read a number the model may have written as a string, e.g. "20 minutes" or "450 kcal" """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        number = value
+    else:
+        match = re.search(r"\d+(?:[.,]\d+)?", str(value or ""))
+        if not match:
+            return None
+        number = float(match.group().replace(",", "."))
+    return int(number) if float(number).is_integer() else round(float(number), 1)
+
+@dataclass
+class Recipe:
+    """A generated recipe, with nutrition figures for the whole recipe"""
+    title: str
+    instructions: str = ""
+    time: Optional[float] = None
+    ingredients: List[str] = field(default_factory=list)
+    calories: Optional[float] = None
+    fiber: Optional[float] = None
+    protein: Optional[float] = None
+    # False when recovered from a response that was cut off
+    complete: bool = True
+
+    @classmethod
+    def from_dict(cls, data, complete: bool = True) -> Optional["Recipe"]:
+        """Build a recipe from parsed JSON, or None if it has no usable title"""
+        if not isinstance(data, dict):
+            return None
+        title = data.get("title")
+        if not isinstance(title, str) or not title.strip():
+            return None
+
+        instructions = data.get("instructions", "")
+        if isinstance(instructions, list):
+            instructions = " ".join(str(step) for step in instructions)
+
+        ingredients = data.get("ingredients") or []
+        if not isinstance(ingredients, list):
+            ingredients = [ingredients]
+
+        return cls(
+            title=title.strip(),
+            instructions=str(instructions),
+            time=_number(data.get("time")),
+            ingredients=[str(ingredient) for ingredient in ingredients],
+            calories=_number(data.get("calories")),
+            fiber=_number(data.get("fiber")),
+            protein=_number(data.get("protein")),
+            complete=complete
+        )
+
+    def to_dict(self) -> Dict:
+        data = asdict(self)
+        del data["complete"]
+        return data
+
+def recipes_to_json(recipes: List[Recipe]) -> str:
+    """Serialize recipes in the {"recipe 1": ...} response shape"""
+    return json.dumps({f"recipe {i + 1}": recipe.to_dict() for i, recipe in enumerate(recipes)})
+
+class RecipeStreamParser:
+    """
+    Incrementally scan streamed text for the {"recipe 1": {...}, ...} response
+    and emit each recipe as soon as its closing brace arrives
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.position = 0
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.object_start = None
+        self.count = 0
+
+    def feed(self, text: str) -> List[Recipe]:
+        """Add a chunk of streamed text and return the recipes completed by it"""
+        self.buffer += text
+        completed = []
+
+        while self.position < len(self.buffer):
+            char = self.buffer[self.position]
+
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char == '{':
+                self.depth += 1
+                if self.depth == 2:
+                    self.object_start = self.position
+            elif char == '}':
+                if self.depth == 2 and self.object_start is not None:
+                    recipe = self._parse_object(self.buffer[self.object_start:self.position + 1])
+                    if recipe is not None:
+                        self.count += 1
+                        completed.append(recipe)
+                    self.object_start = None
+                self.depth = max(self.depth - 1, 0)
+
+            self.position += 1
+
+        return completed
+
+    def finish(self) -> List[Recipe]:
+        """At the end of the stream, recover the recipe that was cut off, if it has enough to show"""
+        if self.object_start is None:
+            return []
+        data = close_truncated(self.buffer[self.object_start:])
+        recipe = Recipe.from_dict(data, complete=False)
+        self.object_start = None
+        if recipe is None or not recipe.ingredients:
+            return []
+        self.count += 1
+        return [recipe]
+
+    def _parse_object(self, json_str: str) -> Optional[Recipe]:
+        try:
+            return Recipe.from_dict(loads_lenient(json_str))
+        except json.JSONDecodeError:
+            return Recipe.from_dict(close_truncated(json_str))
+
+def parse_recipe(text: str) -> Optional[Recipe]:
+    """Parse a response holding a single recipe object"""
+    data = parse_json_object(text)
+    recipe = Recipe.from_dict(data)
+    return recipe if recipe is not None and recipe.ingredients else None
+
+def parse_recipes(text: str) -> List[Recipe]:
+    """
+    Parse a recipes response, recovering as many recipes as possible from
+    malformed or truncated output
+    """
+    text = strip_code_fences(text or "")
+    parser = RecipeStreamParser()
+    recipes = parser.feed(text) + parser.finish()
+    if recipes:
+        return recipes
+
+    # Not the {"recipe 1": ...} shape: a bare list of recipes, or a single one
+    start = text.find('[')
+    if start != -1 and (text.find('{') == -1 or start < text.find('{')):
+        data = close_truncated(text[start:text.rfind(']') + 1] or text[start:])
+        if isinstance(data, list):
+            return [recipe for recipe in map(Recipe.from_dict, data) if recipe is not None]
+
+    recipe = parse_recipe(text)
+    return [recipe] if recipe is not None else []
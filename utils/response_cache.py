@@ -0,0 +1,188 @@
+import os
+import re
+import math
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+import streamlit as st
+
+EMBEDDING_DIMENSIONS = 512
+
+def normalize_preferences(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace so trivial variants share a key"""
+    text = (text or "").lower()
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+# Preferences that ask for nothing in particular, e.g. answered by speculative or stored recipes
+GENERIC_PREFERENCES = {
+    "", "none", "no", "nothing", "n a", "na", "any", "anything", "whatever", "no preference",
+    "no preferences", "nothing special", "nothing in particular", "anything is fine",
+    "i don t know", "dont know", "idk", "surprise me", "you choose", "up to you"
+}
+
+def is_generic_preference(meal_preferences: str) -> bool:
+    """Whether a meal preference is empty or asks for nothing in particular"""
+    return normalize_preferences(meal_preferences) in GENERIC_PREFERENCES
+
+def hashed_ngram_embedding(text: str) -> Dict[int, float]:
+    """
+    Cheap local embedding: hashed word and character-trigram counts,
+    L2-normalized and stored sparsely as {dimension: weight}
+    """
+    normalized = normalize_preferences(text)
+    features = normalized.split()
+    padded = f" {normalized} "
+    features += [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+    vector: Dict[int, float] = {}
+    for feature in features:
+        digest = hashlib.md5(feature.encode("utf-8")).digest()
+        index = int.from_bytes(digest[:4], "little") % EMBEDDING_DIMENSIONS
+        vector[index] = vector.get(index, 0.0) + 1.0
+
+    norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+    if norm == 0:
+        return {}
+    return {index: weight / norm for index, weight in vector.items()}
+
+def cosine_similarity(a: Dict[int, float], b: Dict[int, float]) -> float:
+    """Cosine similarity of two sparse, L2-normalized vectors"""
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(index, 0.0) for index, weight in a.items())
+
+@dataclass
+class CacheEntry:
+    context_key: str
+    embedding: Dict[int, float]
+    value: str
+    expires_at: float
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache of LLM responses with a TTL.
+
+    Entries are keyed by a fingerprint of the fixed prompt context (model,
+    restrictions, goals) plus the normalized free-text preferences. When
+    similarity_threshold is below 1.0, a miss on the exact fingerprint falls
+    back to the nearest cached preferences within the same context.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 3600,
+                 similarity_threshold: float = 1.0,
+                 embed: Callable[[str], Dict[int, float]] = hashed_ngram_embedding):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.embed = embed
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _context_key(self, context: str) -> str:
+        return hashlib.sha256(context.encode("utf-8")).hexdigest()
+
+    def _fingerprint(self, context_key: str, preferences: str) -> str:
+        payload = f"{context_key}\x00{normalize_preferences(preferences)}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _evict_expired(self, now: float) -> None:
+        expired = [key for key, entry in self._entries.items() if entry.expires_at <= now]
+        for key in expired:
+            del self._entries[key]
+
+    def get(self, context: str, preferences: str) -> Optional[str]:
+        """Return the cached response for this prompt, or None on a miss"""
+        if not self.enabled:
+            return None
+
+        context_key = self._context_key(context)
+        fingerprint = self._fingerprint(context_key, preferences)
+
+        with self._lock:
+            now = time.time()
+            self._evict_expired(now)
+
+            entry = self._entries.get(fingerprint)
+            if entry is not None:
+                self._entries.move_to_end(fingerprint)
+                self.hits += 1
+                return entry.value
+
+            if self.similarity_threshold < 1.0:
+                embedding = self.embed(preferences)
+                best_key, best_score = None, self.similarity_threshold
+                for key, candidate in self._entries.items():
+                    if candidate.context_key != context_key:
+                        continue
+                    score = cosine_similarity(embedding, candidate.embedding)
+                    if score >= best_score:
+                        best_key, best_score = key, score
+                if best_key is not None:
+                    self._entries.move_to_end(best_key)
+                    self.hits += 1
+                    self.semantic_hits += 1
+                    return self._entries[best_key].value
+
+            self.misses += 1
+            return None
+
+    def put(self, context: str, preferences: str, value: str) -> None:
+        """Cache a response, evicting the least recently used entries if full"""
+        if not self.enabled or not value:
+            return
+
+        context_key = self._context_key(context)
+        fingerprint = self._fingerprint(context_key, preferences)
+        entry = CacheEntry(
+            context_key=context_key,
+            embedding=self.embed(preferences) if self.similarity_threshold < 1.0 else {},
+            value=value,
+            expires_at=time.time() + self.ttl_seconds
+        )
+
+        with self._lock:
+            self._entries[fingerprint] = entry
+            self._entries.move_to_end(fingerprint)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict:
+        """Get cache statistics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+@st.cache_resource
+def get_response_cache():
+    """
+    Get the process-wide response cache for meal recommendations
+
+    Configured by GROQ_CACHE_SIZE (0 disables it), GROQ_CACHE_TTL in seconds
+    and GROQ_CACHE_SIMILARITY (below 1.0 enables nearest-neighbour hits).
+    """
+    return ResponseCache(
+        max_entries=int(os.getenv('GROQ_CACHE_SIZE', '256')),
+        ttl_seconds=float(os.getenv('GROQ_CACHE_TTL', '3600')),
+        similarity_threshold=float(os.getenv('GROQ_CACHE_SIMILARITY', '1.0'))
+    )
@@ -1,24 +1,36 @@
 import streamlit as st
 
+# Per-user state of the meal flow and speculation, dropped on logout so the next
+# user of the browser session never sees it
+USER_STATE_KEYS = (
+    'speculated', 'speculative_meal_job', 'speculative_meal_user', 'meal_recommendations',
+    'meal_recommendations_job', 'meal_recommendations_failed', 'user_meal_preferences', 'selected_recipe'
+)
+
 def initialize_session_state():
     """Initialize session state variables"""
     if 'authenticated' not in st.session_state:
         st.session_state.authenticated = False
-    if 'user_data' not in st.session_state:
-        st.session_state.user_data = None
+    if 'user_name' not in st.session_state:
+        st.session_state.user_name = None
     if 'current_view' not in st.session_state:
         st.session_state.current_view = 'onboarding'
 
 def logout_user():
     """Clear user session and return to onboarding"""
     st.session_state.authenticated = False
-    st.session_state.user_data = None
+    st.session_state.user_name = None
     st.session_state.current_view = 'onboarding'
+    for key in USER_STATE_KEYS:
+        st.session_state.pop(key, None)
 
-def login_user(user_data):
-    """Set user as authenticated and store user data"""
+def login_user(profile):
+    """
+    Set user as authenticated; views get the profile from the profile cache,
+    see utils.profile_cache.current_user_profile
+    """
     st.session_state.authenticated = True
-    st.session_state.user_data = user_data
+    st.session_state.user_name = profile.user_name
     st.session_state.current_view = 'dashboard'
 
 def navigate_to(view_name):
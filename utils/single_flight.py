@@ -0,0 +1,129 @@
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, Tuple
+import streamlit as st
+
+class _Call:
+    """An in-flight call and the outcome its waiters will share"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class _Stream:
+    """An in-flight stream whose chunks are replayed to every subscriber"""
+
+    def __init__(self):
+        self.changed = threading.Condition()
+        self.chunks = []
+        self.finished = False
+        self.error = None
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key: the first caller runs the
+    function, callers arriving while it is in flight wait and share its result
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._streams: Dict[str, _Stream] = {}
+        self.executed = 0
+        self.shared = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run fn once for all concurrent callers using this key
+
+        Returns:
+            Tuple[Any, bool]: the result, and whether it was shared from another caller's call
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.shared += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stream(self, key: str, fn: Callable[[], Iterable]) -> Iterator:
+        """
+        Iterate over fn() once for all concurrent callers using this key;
+        late subscribers first receive the chunks already produced
+        """
+        with self._lock:
+            stream = self._streams.get(key)
+            if stream is not None:
+                self.shared += 1
+                leader = False
+            else:
+                stream = _Stream()
+                self._streams[key] = stream
+                self.executed += 1
+                leader = True
+
+        if leader:
+            try:
+                for chunk in fn():
+                    with stream.changed:
+                        stream.chunks.append(chunk)
+                        stream.changed.notify_all()
+                    yield chunk
+            except Exception as e:
+                stream.error = e
+                raise
+            finally:
+                with self._lock:
+                    del self._streams[key]
+                with stream.changed:
+                    stream.finished = True
+                    stream.changed.notify_all()
+            return
+
+        position = 0
+        while True:
+            with stream.changed:
+                while position >= len(stream.chunks) and not stream.finished:
+                    stream.changed.wait()
+                chunks = stream.chunks[position:]
+                position += len(chunks)
+                finished = stream.finished and position >= len(stream.chunks)
+            yield from chunks
+            if finished:
+                break
+        if stream.error is not None:
+            raise stream.error
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                "in_flight": len(self._calls) + len(self._streams),
+                "executed": self.executed,
+                "shared": self.shared
+            }
+
+@st.cache_resource
+def get_single_flight():
+    """Get the process-wide single-flight group for upstream API calls"""
+    return SingleFlight()
@@ -0,0 +1,174 @@
+import os
+import time
+import queue
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+import streamlit as st
+from snowflake.snowpark import Session
+from snowflake.snowpark.context import get_active_session
+
+logger = logging.getLogger(__name__)
+
+# Sessions unused for longer than this are checked with a trivial query before being handed out
+HEALTH_CHECK_INTERVAL = float(os.getenv('SNOWFLAKE_HEALTH_CHECK_INTERVAL', '60'))
+
+def _connection_parameters() -> Dict:
+    """
+    Parameters for local runs: a named connection from connections.toml
+    (SNOWFLAKE_CONNECTION_NAME), or SNOWFLAKE_ACCOUNT, SNOWFLAKE_USER, ... variables
+    """
+    connection_name = os.getenv('SNOWFLAKE_CONNECTION_NAME')
+    if connection_name:
+        return {"connection_name": connection_name}
+    parameters = {
+        key: os.getenv(f"SNOWFLAKE_{key.upper()}")
+        for key in ("account", "user", "password", "authenticator", "role", "warehouse", "database", "schema")
+    }
+    return {key: value for key, value in parameters.items() if value}
+
+def _create_local_session() -> Session:
+    return Session.builder.configs(_connection_parameters()).create()
+
+def _active_session() -> Optional[Session]:
+    """The session provided by Snowflake when running as a Streamlit in Snowflake app"""
+    try:
+        return get_active_session()
+    except Exception:
+        return None
+
+def is_healthy(session: Session) -> bool:
+    try:
+        session.sql("SELECT 1").collect()
+        return True
+    except Exception as e:
+        logger.warning(f"Snowflake session health check failed: {e}")
+        return False
+
+def _close(session: Session) -> None:
+    try:
+        session.close()
+    except Exception:
+        pass
+
+class _PooledSession:
+    def __init__(self, session: Session):
+        self.session = session
+        self.checked_at = time.monotonic()
+
+class SessionPool:
+    """
+    Bounded pool of Snowpark sessions for local runs, where each session
+    is a connection of its own. Idle sessions are health-checked when
+    handed out after HEALTH_CHECK_INTERVAL, and broken ones replaced.
+    """
+
+    def __init__(self, factory: Callable[[], Session], size: int = 4,
+                 health_check_interval: float = HEALTH_CHECK_INTERVAL):
+        self.factory = factory
+        self.size = size
+        self.health_check_interval = health_check_interval
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _checkout(self) -> _PooledSession:
+        while True:
+            try:
+                entry = self._idle.get_nowait()
+            except queue.Empty:
+                return _PooledSession(self.factory())
+            if time.monotonic() - entry.checked_at < self.health_check_interval or is_healthy(entry.session):
+                return entry
+            _close(entry.session)
+
+    @contextmanager
+    def session(self, timeout: Optional[float] = None):
+        """Borrow a session for the duration of the block"""
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError("No Snowflake session available")
+        entry = None
+        broken = False
+        try:
+            entry = self._checkout()
+            yield entry.session
+        except Exception:
+            # Do not hand the session out again if the error came from the connection
+            broken = entry is not None and not is_healthy(entry.session)
+            raise
+        finally:
+            if entry is not None:
+                if broken:
+                    _close(entry.session)
+                else:
+                    entry.checked_at = time.monotonic()
+                    self._idle.put(entry)
+            self._slots.release()
+
+    def close(self) -> None:
+        while True:
+            try:
+                _close(self._idle.get_nowait().session)
+            except queue.Empty:
+                return
+
+class SessionManager:
+    """
+    One Snowpark session per process inside Snowflake, or a pool of
+    sessions for local runs, health-checked and reconnected when stale
+    """
+
+    def __init__(self, pool_size: int = 4, health_check_interval: float = HEALTH_CHECK_INTERVAL):
+        self.health_check_interval = health_check_interval
+        self._lock = threading.Lock()
+        self._active = _active_session()
+        self._active_checked_at = time.monotonic()
+        self.pool = None if self._active is not None else SessionPool(
+            _create_local_session, pool_size, health_check_interval
+        )
+
+    @property
+    def in_snowflake(self) -> bool:
+        return self.pool is None
+
+    def _checked_active_session(self) -> Session:
+        with self._lock:
+            if time.monotonic() - self._active_checked_at >= self.health_check_interval:
+                if not is_healthy(self._active):
+                    logger.info("Reconnecting the Snowflake session")
+                    self._active = get_active_session()
+                self._active_checked_at = time.monotonic()
+            return self._active
+
+    @contextmanager
+    def session(self):
+        """Use a healthy session for the duration of the block"""
+        if self.in_snowflake:
+            yield self._checked_active_session()
+        else:
+            with self.pool.session() as session:
+                yield session
+
+    def warm_up(self) -> None:
+        """Open a pooled session in the background, so the first query does not pay for the connection"""
+        if self.in_snowflake:
+            return
+
+        def open_session():
+            try:
+                with self.session():
+                    pass
+            except Exception as e:
+                logger.error(f"Snowflake session warm-up failed: {e}")
+
+        threading.Thread(target=open_session, name="snowflake-warm-up", daemon=True).start()
+
+@st.cache_resource
+def get_session_manager():
+    """
+    Get the process-wide Snowflake session manager; local runs pool up to
+    SNOWFLAKE_POOL_SIZE sessions (default 4), opened in the background
+    """
+    manager = SessionManager(pool_size=int(os.getenv('SNOWFLAKE_POOL_SIZE', '4')))
+    manager.warm_up()
+    return manager
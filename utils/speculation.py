@@ -0,0 +1,117 @@
+import os
+import time
+import logging
+import threading
+from typing import Dict, Optional
+import streamlit as st
+from utils.jobs import get_job_queue, FAILED, PENDING
+from utils.rate_limiter import TokenBucket, BACKGROUND
+from utils.response_cache import get_response_cache, is_generic_preference
+
+logger = logging.getLogger(__name__)
+
+# GROQ_SPECULATE=true starts generating recipes for "no particular preference" when the dashboard loads
+SPECULATION_ENABLED = os.getenv('GROQ_SPECULATE', 'false').lower() == 'true'
+
+class Speculator:
+    """
+    Budget and hit-rate bookkeeping for speculative recipe generation
+
+    At most `budget_per_hour` speculative generations start per hour across
+    the process (0 disables the cap), so idle dashboard visits cannot use
+    up the API quota.
+    """
+
+    def __init__(self, budget_per_hour: int):
+        self.budget = TokenBucket(budget_per_hour, budget_per_hour / 3600) if budget_per_hour else None
+        self._lock = threading.Lock()
+        self._counts = {"launched": 0, "skipped_budget": 0, "skipped_cached": 0, "hits": 0, "misses": 0}
+
+    def try_launch(self) -> bool:
+        """Take one generation from the budget, if any is left"""
+        with self._lock:
+            if self.budget is not None:
+                if self.budget.time_until(1, time.monotonic()) > 0:
+                    self._counts["skipped_budget"] += 1
+                    return False
+                self.budget.consume(1)
+            self._counts["launched"] += 1
+            return True
+
+    def count(self, outcome: str) -> None:
+        with self._lock:
+            self._counts[outcome] += 1
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._counts)
+        claims = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / claims if claims else None
+        return stats
+
+@st.cache_resource
+def get_speculator():
+    """Get the process-wide speculator, capped by SPECULATION_BUDGET generations per hour (default 20)"""
+    return Speculator(int(os.getenv('SPECULATION_BUDGET', '20')))
+
+def _generate_speculatively(user_data):
+    # Imported here so the dashboard does not load the client unless speculation is on
+    from utils.groq_client import GroqClient
+    return GroqClient().generate_meal_recommendations(user_data, "", priority=BACKGROUND)
+
+def speculate_meal_recommendations(user_data) -> Optional[str]:
+    """
+    Start generating recipes for an empty preference in the background,
+    once per session, and return the job id
+    """
+    if not SPECULATION_ENABLED or user_data is None:
+        return None
+    # Set on the first attempt and never cleared, claiming the job included
+    if st.session_state.get('speculated'):
+        return st.session_state.get('speculative_meal_job')
+    st.session_state.speculated = True
+
+    speculator = get_speculator()
+    try:
+        from utils.groq_client import GroqClient
+        cache_context = GroqClient()._meal_cache_context(user_data)
+    except Exception as e:
+        logger.error(f"Speculation skipped: {e}")
+        return None
+    if get_response_cache().get(cache_context, ""):
+        # Already answered from the cache, nothing to pre-generate
+        speculator.count("skipped_cached")
+        return None
+    if not speculator.try_launch():
+        return None
+
+    job_id = get_job_queue().submit_background("speculative_meal_recommendations", _generate_speculatively, user_data)
+    st.session_state.speculative_meal_job = job_id
+    # The recipes fit this user's restrictions and allergies only
+    st.session_state.speculative_meal_user = user_data.user_name
+    return job_id
+
+def claim_speculation(meal_preferences: str, user_data) -> Optional[str]:
+    """
+    The id of the speculative job to use for these preferences (finished
+    or still running), or None if a regular generation is needed
+    """
+    job_id = st.session_state.pop('speculative_meal_job', None)
+    job_user = st.session_state.pop('speculative_meal_user', None)
+    if job_id is None:
+        return None
+    if user_data is None or job_user != user_data.user_name:
+        logger.warning("[SPECULATION] Not claiming a job started for another user")
+        return None
+
+    speculator = get_speculator()
+    job = get_job_queue().get(job_id)
+    # Still queued on the background pool: a regular generation starts sooner
+    usable = job is not None and job.status not in (PENDING, FAILED) and (not job.done or job.result)
+    if usable and is_generic_preference(meal_preferences):
+        speculator.count("hits")
+    else:
+        speculator.count("misses")
+        job_id = None
+    logger.info(f"[SPECULATION] {speculator.get_stats()}")
+    return job_id
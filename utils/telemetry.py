@@ -0,0 +1,243 @@
+import os
+import json
+import time
+import logging
+import threading
+from collections import defaultdict, deque
+from dataclasses import dataclass, asdict, field
+from typing import Dict, List, Optional
+import streamlit as st
+from utils.latency import RollingPercentiles
+
+logger = logging.getLogger(__name__)
+
+# Latency phases recorded per call, in seconds
+PHASES = ("connect", "ttfb", "total")
+QUANTILES = (50, 95, 99)
+
+@dataclass
+class CallRecord:
+    """Measurements of one upstream API call (or of a call answered from cache)"""
+    task: str
+    model: str
+    status: Optional[int] = None
+    outcome: str = "ok"
+    connect: Optional[float] = None
+    ttfb: Optional[float] = None
+    total: Optional[float] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    # US dollars, when the model's price is known
+    cost: Optional[float] = None
+    retries: int = 0
+    cache_hit: bool = False
+    streamed: bool = False
+    started_at: float = field(default_factory=time.time)
+
+class LoggingSpanExporter:
+    """OpenTelemetry stand-in: logs each call as a span-shaped JSON line"""
+
+    def export(self, spans: List[Dict]) -> None:
+        for span in spans:
+            logger.info(f"[SPAN] {json.dumps(span)}")
+
+class InMemorySpanExporter:
+    """OpenTelemetry stand-in keeping the last spans in memory, for inspection"""
+
+    def __init__(self, size: int = 1000):
+        self.spans = deque(maxlen=size)
+
+    def export(self, spans: List[Dict]) -> None:
+        self.spans.extend(spans)
+
+def _to_span(record: CallRecord) -> Dict:
+    """Shape a call record like an OpenTelemetry span"""
+    end = record.started_at + (record.total or 0)
+    attributes = {f"groq.{key}": value for key, value in asdict(record).items()
+                  if key not in ("started_at", "task") and value is not None}
+    return {
+        "name": f"groq.{record.task}",
+        "start_time_unix_nano": int(record.started_at * 1e9),
+        "end_time_unix_nano": int(end * 1e9),
+        "attributes": attributes,
+        "status": {"code": "OK" if record.outcome in ("ok", "cache_hit") else "ERROR"}
+    }
+
+def _labels(**labels) -> str:
+    return ",".join(f'{key}="{str(value).replace(chr(34), chr(39))}"' for key, value in labels.items())
+
+class Telemetry:
+    """
+    In-process metrics for upstream API calls: counters, rolling latency
+    percentiles per task and phase, and span export
+    """
+
+    def __init__(self, window_size: int = 1000, textfile_path: Optional[str] = None):
+        self.window_size = window_size
+        # Rewritten after every call when set, see write_prometheus_textfile
+        self.textfile_path = textfile_path
+        self.exporters = []
+        self._lock = threading.Lock()
+        self._calls = defaultdict(int)
+        self._tokens = defaultdict(int)
+        self._retries = defaultdict(int)
+        self._cost = defaultdict(float)
+        self._latency_sum = defaultdict(float)
+        self._latency_count = defaultdict(int)
+        self._windows: Dict[tuple, RollingPercentiles] = {}
+        self._model_windows: Dict[str, RollingPercentiles] = {}
+
+    def add_exporter(self, exporter) -> None:
+        self.exporters.append(exporter)
+
+    def _window(self, key: tuple) -> RollingPercentiles:
+        if key not in self._windows:
+            self._windows[key] = RollingPercentiles(self.window_size)
+        return self._windows[key]
+
+    def record(self, record: CallRecord) -> None:
+        """Record one call"""
+        with self._lock:
+            self._calls[(record.task, record.model, record.outcome, record.status or "")] += 1
+            self._retries[(record.task, record.model)] += record.retries
+            if record.prompt_tokens:
+                self._tokens[(record.task, record.model, "prompt")] += record.prompt_tokens
+            if record.completion_tokens:
+                self._tokens[(record.task, record.model, "completion")] += record.completion_tokens
+            if record.cost:
+                self._cost[(record.task, record.model)] += record.cost
+            if not record.cache_hit and record.total is not None:
+                if record.model not in self._model_windows:
+                    self._model_windows[record.model] = RollingPercentiles(self.window_size)
+                self._model_windows[record.model].add(record.total)
+            if not record.cache_hit:
+                for phase in PHASES:
+                    value = getattr(record, phase)
+                    if value is not None:
+                        self._window((record.task, phase)).add(value)
+                        self._latency_sum[(record.task, phase)] += value
+                        self._latency_count[(record.task, phase)] += 1
+
+        if self.textfile_path:
+            try:
+                self.write_prometheus_textfile(self.textfile_path)
+            except OSError as e:
+                logger.error(f"Metrics textfile error: {e}")
+
+        if self.exporters:
+            span = _to_span(record)
+            for exporter in self.exporters:
+                try:
+                    exporter.export([span])
+                except Exception as e:
+                    logger.error(f"Span export error: {e}")
+
+    def record_cache_hit(self, task: str, model: Optional[str]) -> None:
+        """Record a result served from a cache or memo instead of an upstream call"""
+        self.record(CallRecord(task=task, model=model or '', outcome="cache_hit", cache_hit=True, total=0.0))
+
+    def percentiles(self, task: str, phase: str = "total") -> Dict[str, Optional[float]]:
+        """Rolling p50/p95/p99 for a task and latency phase"""
+        with self._lock:
+            window = self._windows.get((task, phase))
+        if window is None:
+            return {f"p{q}": None for q in QUANTILES}
+        return {f"p{q}": window.percentile(q) for q in QUANTILES}
+
+    def model_percentiles(self, model: str) -> Dict[str, Optional[float]]:
+        """Rolling p50/p95/p99 of the total call time for a model, across tasks"""
+        with self._lock:
+            window = self._model_windows.get(model)
+        if window is None:
+            return {f"p{q}": None for q in QUANTILES}
+        return {f"p{q}": window.percentile(q) for q in QUANTILES}
+
+    def summary(self) -> Dict:
+        """Latency percentiles of every task and phase and of every model, plus call counts and costs"""
+        with self._lock:
+            keys = list(self._windows)
+            models = list(self._model_windows)
+            calls = dict(self._calls)
+            cost = dict(self._cost)
+        latency = defaultdict(dict)
+        for task, phase in keys:
+            latency[task][phase] = self.percentiles(task, phase)
+        return {
+            "latency": dict(latency),
+            "model_latency": {model: self.model_percentiles(model) for model in models},
+            "calls": {"/".join(str(part) for part in key): count for key, count in calls.items()},
+            "cost": {"/".join(key): round(value, 6) for key, value in cost.items()}
+        }
+
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            lines.append("# HELP groq_calls_total Upstream calls by task, model, outcome and HTTP status")
+            lines.append("# TYPE groq_calls_total counter")
+            for (task, model, outcome, status), count in sorted(self._calls.items(), key=str):
+                lines.append(f"groq_calls_total{{{_labels(task=task, model=model, outcome=outcome, status=status)}}} {count}")
+
+            lines.append("# HELP groq_tokens_total Tokens used by task, model and kind")
+            lines.append("# TYPE groq_tokens_total counter")
+            for (task, model, kind), count in sorted(self._tokens.items()):
+                lines.append(f"groq_tokens_total{{{_labels(task=task, model=model, kind=kind)}}} {count}")
+
+            lines.append("# HELP groq_retries_total Retried attempts by task and model")
+            lines.append("# TYPE groq_retries_total counter")
+            for (task, model), count in sorted(self._retries.items()):
+                lines.append(f"groq_retries_total{{{_labels(task=task, model=model)}}} {count}")
+
+            lines.append("# HELP groq_cost_dollars_total Estimated spend in US dollars by task and model")
+            lines.append("# TYPE groq_cost_dollars_total counter")
+            for (task, model), value in sorted(self._cost.items()):
+                lines.append(f"groq_cost_dollars_total{{{_labels(task=task, model=model)}}} {value:.8f}")
+
+            lines.append("# HELP groq_latency_seconds Call latency by task and phase (rolling window quantiles)")
+            lines.append("# TYPE groq_latency_seconds summary")
+            windows = dict(self._windows)
+            model_windows = dict(self._model_windows)
+            sums, counts = dict(self._latency_sum), dict(self._latency_count)
+
+        for (task, phase), window in sorted(windows.items()):
+            for q in QUANTILES:
+                value = window.percentile(q)
+                if value is not None:
+                    lines.append(f"groq_latency_seconds{{{_labels(task=task, phase=phase, quantile=q / 100)}}} {value:.6f}")
+            lines.append(f"groq_latency_seconds_sum{{{_labels(task=task, phase=phase)}}} {sums[(task, phase)]:.6f}")
+            lines.append(f"groq_latency_seconds_count{{{_labels(task=task, phase=phase)}}} {counts[(task, phase)]}")
+
+        lines.append("# HELP groq_model_latency_seconds Total call time by model (rolling window quantiles)")
+        lines.append("# TYPE groq_model_latency_seconds gauge")
+        for model, window in sorted(model_windows.items()):
+            for q in QUANTILES:
+                value = window.percentile(q)
+                if value is not None:
+                    lines.append(f"groq_model_latency_seconds{{{_labels(model=model, quantile=q / 100)}}} {value:.6f}")
+
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus_textfile(self, path: str) -> None:
+        """Write the metrics atomically, e.g. for the node_exporter textfile collector"""
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "w") as metrics_file:
+            metrics_file.write(self.render_prometheus())
+        os.replace(temporary_path, path)
+
+@st.cache_resource
+def get_telemetry():
+    """
+    Get the process-wide telemetry registry. TELEMETRY_EXPORTER=log logs
+    every call as a span; =memory keeps the last spans in memory.
+    TELEMETRY_PROMETHEUS_FILE, if set, is kept up to date with the metrics.
+    """
+    telemetry = Telemetry(
+        window_size=int(os.getenv('TELEMETRY_WINDOW', '1000')),
+        textfile_path=os.getenv('TELEMETRY_PROMETHEUS_FILE') or None
+    )
+    exporter = os.getenv('TELEMETRY_EXPORTER', 'none').lower()
+    if exporter == 'log':
+        telemetry.add_exporter(LoggingSpanExporter())
+    elif exporter == 'memory':
+        telemetry.add_exporter(InMemorySpanExporter())
+    return telemetry
@@ -0,0 +1,186 @@
+import os
+import time
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Sequence
+import streamlit as st
+from utils.snowflake_session import get_session_manager
+
+logger = logging.getLogger(__name__)
+
+def execute_sql(query: str, params: List) -> None:
+    with get_session_manager().session() as session:
+        session.sql(query, params=params).collect()
+
+def fetch_sql(query: str, params: List) -> List[tuple]:
+    with get_session_manager().session() as session:
+        return [tuple(row) for row in session.sql(query, params=params).collect()]
+
+class WriteBuffer:
+    """
+    Write-behind buffer for inserts into one table.
+
+    Rows added from any thread are written by a background thread as one
+    multi-row INSERT, once `max_rows` are pending or the oldest has waited
+    `max_delay` seconds. Each add() returns a Future that resolves to
+    True once the statement containing the row has committed, or fails
+    with its error; a failed batch is retried row by row so one bad row
+    does not fail the others. Cancelling a future before its row is
+    taken into a batch withdraws the row.
+    """
+
+    def __init__(self, table: str, columns: Sequence[str], execute: Callable[[str, List], None] = execute_sql,
+                 max_rows: int = 50, max_delay: float = 0.05):
+        self.table = table
+        self.columns = list(columns)
+        self.execute = execute
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self._pending = []
+        self._changed = threading.Condition()
+        self.batches = 0
+        self.rows = 0
+        self.failures = 0
+        threading.Thread(target=self._run, name=f"write-buffer-{table}", daemon=True).start()
+
+    def add(self, row: Sequence) -> Future:
+        """Queue a row, values in `columns` order"""
+        if len(row) != len(self.columns):
+            raise ValueError(f"Expected {len(self.columns)} values, got {len(row)}")
+        future = Future()
+        with self._changed:
+            self._pending.append((list(row), future, time.monotonic()))
+            self._changed.notify()
+        return future
+
+    def _insert_query(self, rows: int) -> str:
+        placeholders = "(" + ", ".join("?" for _ in self.columns) + ")"
+        return (f"INSERT INTO {self.table} ({', '.join(self.columns)}) VALUES "
+                + ", ".join(placeholders for _ in range(rows)))
+
+    def _take_batch(self) -> List:
+        with self._changed:
+            while True:
+                if self._pending:
+                    wait = self._pending[0][2] + self.max_delay - time.monotonic()
+                    if len(self._pending) >= self.max_rows or wait <= 0:
+                        batch = self._pending[:self.max_rows]
+                        del self._pending[:self.max_rows]
+                        # Rows whose future was cancelled while pending are dropped; the others can no longer be
+                        batch = [entry for entry in batch if entry[1].set_running_or_notify_cancel()]
+                        if batch:
+                            return batch
+                        continue
+                    self._changed.wait(wait)
+                else:
+                    self._changed.wait()
+
+    def _write(self, batch: List) -> List[bool]:
+        """Write the rows of a batch, returning the result of each"""
+        self.execute(self._insert_query(len(batch)), [value for row, _, _ in batch for value in row])
+        return [True] * len(batch)
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take_batch()
+            try:
+                results = self._write(batch)
+            except Exception as e:
+                if len(batch) == 1:
+                    self._fail(batch[0], e)
+                    continue
+                logger.warning(f"[WRITE] {len(batch)}-row insert into {self.table} failed, retrying row by row: {e}")
+                for entry in batch:
+                    try:
+                        result = self._write([entry])
+                    except Exception as row_error:
+                        self._fail(entry, row_error)
+                    else:
+                        self._succeed([entry], result)
+                continue
+            self._succeed(batch, results)
+
+    def _succeed(self, batch: List, results: List[bool]) -> None:
+        with self._changed:
+            self.batches += 1
+            self.rows += sum(results)
+        for (_, future, _), result in zip(batch, results):
+            future.set_result(result)
+
+    def _fail(self, entry, error: Exception) -> None:
+        with self._changed:
+            self.failures += 1
+        entry[1].set_exception(error)
+
+    def get_stats(self) -> Dict:
+        with self._changed:
+            return {
+                "pending": len(self._pending),
+                "batches": self.batches,
+                "rows": self.rows,
+                "rows_per_batch": self.rows / self.batches if self.batches else None,
+                "failures": self.failures
+            }
+
+class UniqueWriteBuffer(WriteBuffer):
+    """
+    WriteBuffer for a table whose `key` column must stay unique, which
+    Snowflake does not enforce: each batch is written with a MERGE that
+    only inserts rows whose key is not taken yet (MERGE locks the table,
+    so concurrent writers cannot both insert the same key). Futures
+    resolve to False for the rows that were skipped.
+
+    `marker` is a column that differs between any two added rows, such as
+    a salted password hash; it tells whether the row holding a key after
+    the MERGE is the one that was added.
+    """
+
+    def __init__(self, table: str, columns: Sequence[str], key: str, marker: str,
+                 fetch: Callable[[str, List], List[tuple]] = fetch_sql, **kwargs):
+        self.key = key
+        self.marker = marker
+        self.fetch = fetch
+        super().__init__(table, columns, **kwargs)
+
+    def _merge_query(self, rows: int) -> str:
+        placeholders = "(" + ", ".join("?" for _ in self.columns) + ")"
+        columns = ", ".join(self.columns)
+        return (f"MERGE INTO {self.table} t USING (SELECT * FROM (VALUES "
+                + ", ".join(placeholders for _ in range(rows))
+                + f") AS v ({columns})) s ON t.{self.key} = s.{self.key} "
+                f"WHEN NOT MATCHED THEN INSERT ({columns}) VALUES ({', '.join('s.' + c for c in self.columns)})")
+
+    def _write(self, batch: List) -> List[bool]:
+        key_at = self.columns.index(self.key)
+        marker_at = self.columns.index(self.marker)
+        # Within the batch, the first row with a key wins
+        firsts = {}
+        for row, _, _ in batch:
+            firsts.setdefault(row[key_at], row)
+        rows = list(firsts.values())
+        self.execute(self._merge_query(len(rows)), [value for row in rows for value in row])
+
+        stored = set(self.fetch(
+            f"SELECT {self.key}, {self.marker} FROM {self.table} "
+            f"WHERE {self.key} IN ({', '.join('?' for _ in rows)})",
+            [row[key_at] for row in rows]
+        ))
+        return [(row[key_at], row[marker_at]) in stored for row, _, _ in batch]
+
+@st.cache_resource
+def get_user_write_buffer():
+    """
+    Get the process-wide buffer for new users, flushed every USER_WRITE_BATCH_SIZE
+    rows (default 50) or USER_WRITE_MAX_DELAY seconds (default 0.05); a row
+    whose USER_NAME is taken is not written and its future resolves to False
+    """
+    from utils.database import USERS_TABLE, USER_COLUMNS
+    return UniqueWriteBuffer(
+        USERS_TABLE,
+        USER_COLUMNS,
+        key="USER_NAME",
+        marker="USER_PASSWORD",
+        max_rows=int(os.getenv('USER_WRITE_BATCH_SIZE', '50')),
+        max_delay=float(os.getenv('USER_WRITE_MAX_DELAY', '0.05'))
+    )
@@ -1,15 +1,25 @@
 import streamlit as st
-import json
 from utils.session_manager import logout_user, navigate_to
+from utils.profile_cache import current_user_profile
+from utils.speculation import speculate_meal_recommendations
 
 def dashboard_view():
     """Display the main dashboard with user data"""
-    user = st.session_state.user_data
+    user = current_user_profile()
+    if user is None:
+        st.error("Could not load your profile, please log in again.")
+        if st.button("🚪 Logout", use_container_width=True):
+            logout_user()
+            st.rerun()
+        return
+
+    # Optionally start generating recipes now, in case no particular meal is asked for
+    speculate_meal_recommendations(user)
 
     # Convert gender to full word
-    gender_display = "Male" if user["SEX"] == "M" else "Female"
+    gender_display = "Male" if user.sex == "M" else "Female"
 
-    st.markdown("<h1 style='color:#ff914d;'>👋 Welcome back, <span style='color:#333;'>{}</span>!</h1>".format(user['USER_NAME']), unsafe_allow_html=True)
+    st.markdown("<h1 style='color:#ff914d;'>👋 Welcome back, <span style='color:#333;'>{}</span>!</h1>".format(user.user_name), unsafe_allow_html=True)
 
     st.markdown("""
         <style>
@@ -60,63 +70,41 @@ def dashboard_view():
     with col1:
         st.markdown(f"<div class='metric-card'>👤<br><strong>Gender</strong><br>{gender_display}</div>", unsafe_allow_html=True)
     with col2:
-        st.markdown(f"<div class='metric-card'>🎂<br><strong>Age</strong><br>{user['AGE']}</div>", unsafe_allow_html=True)
+        st.markdown(f"<div class='metric-card'>🎂<br><strong>Age</strong><br>{user.age}</div>", unsafe_allow_html=True)
     with col3:
-        st.markdown(f"<div class='metric-card'>⚖️<br><strong>Weight</strong><br>{user['WEIGHT']} kg</div>", unsafe_allow_html=True)
+        st.markdown(f"<div class='metric-card'>⚖️<br><strong>Weight</strong><br>{user.weight} kg</div>", unsafe_allow_html=True)
 
     col4, col5 = st.columns(2)
     with col4:
-        st.markdown(f"<div class='metric-card'>📏<br><strong>Height</strong><br>{user['HEIGHT']} cm</div>", unsafe_allow_html=True)
+        st.markdown(f"<div class='metric-card'>📏<br><strong>Height</strong><br>{user.height} cm</div>", unsafe_allow_html=True)
     with col5:
-        bmi = user['WEIGHT'] / ((user['HEIGHT'] / 100) ** 2)
+        bmi = user.weight / ((user.height / 100) ** 2)
         st.markdown(f"<div class='metric-card'>📊<br><strong>BMI</strong><br>{bmi:.1f}</div>", unsafe_allow_html=True)
 
     st.markdown("<div class='section-header'>🥦 Dietary Information</div>", unsafe_allow_html=True)
 
     with st.expander("🔎 View Restrictions and Preferences"):
-        try:
-            restrictions = user['DIETARY_RESTRICTIONS']
-
-            # Attempt to extract 3 parts from the restriction string
-            parsed = {
-                "Restrictions": "",
-                "Allergies": "",
-                "Other Preferences": ""
-            }
-
-            if "Allergies" in restrictions:
-                parts = restrictions.split("Allergies")
-                parsed["Restrictions"] = parts[0].replace("Restrictions:", "").strip()
-                if "Other preferences" in parts[1]:
-                    allergy_part, other_part = parts[1].split("Other preferences")
-                    parsed["Allergies"] = allergy_part.strip(": ,")
-                    parsed["Other Preferences"] = other_part.strip(": ,")
-                else:
-                    parsed["Allergies"] = parts[1].strip(": ,")
-            else:
-                parsed["Restrictions"] = restrictions.strip()
-
+        if user.restrictions or user.allergies or user.preferences:
             st.markdown(f"""<div class='styled-list'>
-            <strong>🚫 Restrictions:</strong> {parsed["Restrictions"]}<br>
-            <strong>⚠️ Allergies:</strong> {parsed["Allergies"]}<br>
-            <strong>💡 Other Preferences:</strong> {parsed["Other Preferences"]}
+            <strong>🚫 Restrictions:</strong> {user.restrictions}<br>
+            <strong>⚠️ Allergies:</strong> {user.allergies}<br>
+            <strong>💡 Other Preferences:</strong> {user.preferences}
             </div>""", unsafe_allow_html=True)
-
-        except Exception as e:
-            st.info(f"❌ No dietary restrictions specified. ({str(e)})")
+        else:
+            st.info("❌ No dietary restrictions specified.")
 
     with st.expander("📈 View Your Dietary Goals"):
-        try:
-            goals = json.loads(user['DIETARY_GOALS'])
+        goals = user.goals
+        if goals is not None:
             st.markdown(f"""
             <div class='styled-list'>
-            🔥 <strong>Calories:</strong> {goals['calories']} kCal<br>
-            🌾 <strong>Fiber:</strong> {goals['fiber']} g<br>
-            🥩 <strong>Protein:</strong> {goals['protein']} g
+            🔥 <strong>Calories:</strong> {goals.calories} kCal<br>
+            🌾 <strong>Fiber:</strong> {goals.fiber} g<br>
+            🥩 <strong>Protein:</strong> {goals.protein} g
             </div>
             """, unsafe_allow_html=True)
-        except:
-            st.error(f"Could not parse: {user['DIETARY_GOALS']}")
+        else:
+            st.info("Your dietary goals have not been set yet.")
 
     st.divider()
 
@@ -108,9 +108,9 @@ def login_view():
     # Handle login
     if login_button:
         if username and password:
-            user_data = authenticate_user(username, password)
-            if user_data is not None:
-                login_user(user_data)
+            profile = authenticate_user(username, password)
+            if profile is not None:
+                login_user(profile)
                 st.success("✅ Login successful!")
                 st.rerun()
             else:
@@ -1,14 +1,17 @@
 import streamlit as st
 from utils.session_manager import navigate_to
-from utils.groq_client import GroqClient
+from utils.jobs import get_job_queue
+from utils.groq_client import stream_meal_recommendations
+from utils.speculation import claim_speculation
+from utils.profile_cache import current_user_profile
 
 def meal_preparation_view():
     """Display the meal preparation view"""
     st.title("🥗 Meal Preparation")
     
      
-    # Get user data from session
-    user_data = st.session_state.user_data
+    # Get the user's profile, cached across reruns and sessions
+    user_data = current_user_profile()
     
     # Main question and input
     st.subheader("Let's Plan Your Meal")
@@ -30,31 +33,15 @@ def meal_preparation_view():
     
     # Handle form submission
     if proceed_button:
-        try:
-            # Show loading spinner
-            with st.spinner("Generating personalized meal recommendations..."):
-                # Initialize Groq client
-                groq_client = GroqClient()
-                
-                # Make API call to generate meal recommendations
-                meal_recommendations = groq_client.generate_meal_recommendations(
-                    user_data=user_data,
-                    meal_preferences=meal_preferences
-                )
-                
-                if meal_recommendations:
-                    # Store the API response in session state
-                    st.session_state.meal_recommendations = meal_recommendations
-                    st.session_state.user_meal_preferences = meal_preferences
-                    
-                    # Navigate to recipe choice view
-                    navigate_to('recipe_choice')
-                    st.rerun()
-                else:
-                    st.error("Sorry, we couldn't generate meal recommendations at this time. Please try again.")
-                    
-        except Exception as e:
-            st.error(f"An error occurred while generating recommendations: {str(e)}")
+        # Generation runs as a background job, so reruns don't cancel or repeat it;
+        # the recipe choice page shows recipes as the job produces them
+        st.session_state.pop('meal_recommendations', None)
+        st.session_state.user_meal_preferences = meal_preferences
+        st.session_state.meal_recommendations_job = claim_speculation(meal_preferences, user_data) or get_job_queue().submit(
+            "meal_recommendations", stream_meal_recommendations, user_data, meal_preferences
+        )
+        navigate_to('recipe_choice')
+        st.rerun()
     
     if back_button:
         navigate_to('dashboard')
@@ -170,82 +170,112 @@
 # --------------------------------------------------------------------------------
 
 import streamlit as st
-import json
 import re
 from utils.session_manager import navigate_to
+from utils.jobs import get_job_queue, DONE, JOB_POLL_INTERVAL
+
+STATIC_IMAGES = {
+    "1": "https://images.pexels.com/photos/1279330/pexels-photo-1279330.jpeg",
+    "2": "https://images.pexels.com/photos/1640777/pexels-photo-1640777.jpeg",
+    "3": "https://images.pexels.com/photos/1640772/pexels-photo-1640772.jpeg"
+}
+
+def _display(value):
+    return "?" if value is None else value
+
+def render_recipe_card(i, recipe):
+    """Render one Recipe as a card with its "Choose this recipe" button"""
+    image_url = STATIC_IMAGES.get(str(i + 1), "")
+
+    raw_instruction_text = recipe.instructions
+    instruction_steps = re.split(r'\s*\d+\.\s*', raw_instruction_text)
+    instruction_steps = [step.strip() for step in instruction_steps if step.strip()]
+    steps = ''.join(f"<li>{step}</li>" for step in instruction_steps)
+
+    ingredients_html = ''.join(
+        f"<li><input type='checkbox' checked id='ing_{i}_{j}' style='margin-right:8px;'>"
+        f"<label for='ing_{i}_{j}'>{ingredient}</label></li>"
+        for j, ingredient in enumerate(recipe.ingredients)
+    )
+    incomplete_note = "" if recipe.complete else " (incomplete)"
+
+    st.markdown(f"""
+        <div style="background:#fffaf4; border:2px solid #ff924c; border-radius:15px;
+                    padding:1.5rem; margin-bottom:1.5rem; box-shadow:0 4px 12px rgba(255, 145, 77, 0.2);">
+            <details>
+                <summary style="font-weight:700; font-size:1.2rem; color:#ff6a00; cursor:pointer;">
+                    {recipe.title}{incomplete_note}
+                    <div style="font-weight:normal; font-size:0.9rem; color:#444;">
+                        — {_display(recipe.time)} Min | {_display(recipe.calories)} kCal | {_display(recipe.fiber)}g fiber | {_display(recipe.protein)}g protein
+                    </div>
+                </summary>
+                <div style="margin-top:1rem;">
+                    <img src="{image_url}" alt="Recipe image"
+                        style="width:100%; max-height:200px; object-fit:cover; border-radius:12px; margin-bottom:1rem;" />
+                    <strong>Ingredients:</strong>
+                    <ul>{ingredients_html}</ul>
+                    <strong>Instructions:</strong>
+                    <ol>{steps}</ol>
+                </div>
+            </details>
+        </div>
+    """, unsafe_allow_html=True)
+
+    if st.button(f"↑ Choose this recipe", key=f"choose_{i}"):
+        st.session_state.selected_recipe = {
+            "title": recipe.title,
+            "ingredients": recipe.ingredients,
+            "instructions": recipe.instructions
+        }
+        navigate_to("ordering")
+        st.rerun()
+
+@st.fragment(run_every=JOB_POLL_INTERVAL)
+def render_meal_job(job_id):
+    """Render the recipes of a running generation job, refreshing until it finishes"""
+    job = get_job_queue().get(job_id)
+    if job is None:
+        # Expired or lost with a server restart
+        st.session_state.pop('meal_recommendations_job', None)
+        st.rerun()
+
+    for i, recipe in enumerate(job.partial_results()):
+        render_recipe_card(i, recipe)
+
+    if not job.done:
+        st.caption("⏳ Generating personalized meal recommendations...")
+        return
+
+    st.session_state.pop('meal_recommendations_job', None)
+    if job.status == DONE and job.result:
+        # Kept for later reruns, e.g. when a "Choose this recipe" button is clicked
+        st.session_state.meal_recommendations = job.result
+    else:
+        st.session_state.meal_recommendations_failed = True
+    st.rerun()
 
 def recipe_choice_view():
     st.title("🍽️ Recipe Recommendations")
 
-    static_images = {
-        "1": "https://images.pexels.com/photos/1279330/pexels-photo-1279330.jpeg",
-        "2": "https://images.pexels.com/photos/1640777/pexels-photo-1640777.jpeg",
-        "3": "https://images.pexels.com/photos/1640772/pexels-photo-1640772.jpeg"
-    }
+    if st.session_state.get('meal_recommendations_job'):
+        st.markdown("### What do you want to eat today?")
+        render_meal_job(st.session_state.meal_recommendations_job)
 
-    if 'meal_recommendations' not in st.session_state:
-        st.error("No meal recommendations found.")
+    elif 'meal_recommendations' not in st.session_state:
+        if st.session_state.pop('meal_recommendations_failed', False):
+            st.error("Sorry, we couldn't generate meal recommendations at this time. Please try again.")
+        else:
+            st.error("No meal recommendations found.")
         if st.button("← Back to Meal Preparation"):
             navigate_to('meal_preparation')
             st.rerun()
         return
 
-    st.markdown("### What do you want to eat today?")
-
-    try:
-        recommendations = st.session_state.meal_recommendations
-        start = recommendations.find('{')
-        end = recommendations.rfind('}')
-        json_str = recommendations[start:end+1]
-        recipes = json.loads(json_str)
-
-        for i, recipe in enumerate(recipes.values()):
-            image_url = static_images.get(str(i + 1), "")
-
-            raw_instruction_text = recipe["instructions"]
-            instruction_steps = re.split(r'\s*\d+\.\s*', raw_instruction_text)
-            instruction_steps = [step.strip() for step in instruction_steps if step.strip()]
-            steps = ''.join(f"<li>{step}</li>" for step in instruction_steps)
-
-            ingredients_html = ''.join(
-                f"<li><input type='checkbox' checked id='ing_{i}_{j}' style='margin-right:8px;'>"
-                f"<label for='ing_{i}_{j}'>{ingredient}</label></li>"
-                for j, ingredient in enumerate(recipe["ingredients"])
-            )
-
-            st.markdown(f"""
-                <div style="background:#fffaf4; border:2px solid #ff924c; border-radius:15px;
-                            padding:1.5rem; margin-bottom:1.5rem; box-shadow:0 4px 12px rgba(255, 145, 77, 0.2);">
-                    <details>
-                        <summary style="font-weight:700; font-size:1.2rem; color:#ff6a00; cursor:pointer;">
-                            {recipe['title']}
-                            <div style="font-weight:normal; font-size:0.9rem; color:#444;">
-                                — {recipe['time']} Min | {recipe['calories']} kCal | {recipe['fiber']}g fiber | {recipe['protein']}g protein
-                            </div>
-                        </summary>
-                        <div style="margin-top:1rem;">
-                            <img src="{image_url}" alt="Recipe image"
-                                style="width:100%; max-height:200px; object-fit:cover; border-radius:12px; margin-bottom:1rem;" />
-                            <strong>Ingredients:</strong>
-                            <ul>{ingredients_html}</ul>
-                            <strong>Instructions:</strong>
-                            <ol>{steps}</ol>
-                        </div>
-                    </details>
-                </div>
-            """, unsafe_allow_html=True)
-
-            if st.button(f"↑ Choose this recipe", key=f"choose_{i}"):
-                st.session_state.selected_recipe = {
-                    "title": recipe["title"],
-                    "ingredients": recipe["ingredients"],
-                    "instructions": recipe["instructions"]
-                }
-                navigate_to("ordering")
-                st.rerun()
+    else:
+        st.markdown("### What do you want to eat today?")
 
-    except json.JSONDecodeError:
-        st.warning("Could not parse AI response")
+        for i, recipe in enumerate(st.session_state.meal_recommendations):
+            render_recipe_card(i, recipe)
 
     col1, col2 = st.columns(2)
     with col1:
@@ -256,4 +286,3 @@ def recipe_choice_view():
         if st.button("🏠 Back to Dashboard", use_container_width=True):
             navigate_to('dashboard')
             st.rerun()
-
@@ -113,10 +113,24 @@
 
 
 import streamlit as st
-import json
 from utils.database import create_user
 from utils.session_manager import navigate_to
 from utils.groq_client import GroqClient
+from utils.goals_engine import get_goals_engine, explain_goals_async
+from utils.jobs import get_job_queue, JOB_POLL_INTERVAL
+from utils.json_repair import parse_json_object
+
+@st.fragment(run_every=JOB_POLL_INTERVAL)
+def render_goals_explanation(job_id):
+    """Show the explanation of the computed goals once its job finishes"""
+    job = get_job_queue().get(job_id)
+    if job is not None and not job.done:
+        st.caption("⏳ Explaining your goals...")
+        return
+    st.session_state.pop("goals_explanation_job", None)
+    if job is not None and job.result:
+        st.session_state.goals_explanation = job.result
+    st.rerun()
 
 def register_view():
     st.markdown(
@@ -168,40 +182,49 @@ def register_view():
 
     # Register button logic
     if register_button:
+        # A new submission, so nothing shown from an earlier registration in this session
+        for key in ("account_created", "goals_explanation", "goals_explanation_job"):
+            st.session_state.pop(key, None)
         if username and password:
             try:
                 with st.spinner("Generating personalized dietary goals..."):
-                    try:
-                        groq_client = GroqClient()
-                        dietary_goals_response = groq_client.generate_dietary_goals(
-                            age, sex, weight, height
-                        )
-                    except Exception as e:
-                        st.error(f"API call failed: {e}, proceeding with account creation.")
-                        dietary_goals_response = None
+                    goals_engine = get_goals_engine()
+                    dietary_goals_response = None
+                    goals_data = None
 
-                    if dietary_goals_response:
+                    if goals_engine is not None:
+                        # Numbers are computed locally, only the explanation text comes from the LLM
+                        goals_data = goals_engine.compute(age, sex, weight, height)
+
+                        dietary_goals = f"Calories: {goals_data['calories']}, Fiber: {goals_data['fiber']}g, Protein: {goals_data['protein']}g"
+                        st.success("✅ Dietary goals generated!")
+                        st.info(f"**Your Goals:** {dietary_goals}")
+                    else:
                         try:
-                            start = dietary_goals_response.find('{')
-                            end = dietary_goals_response.rfind('}')
-                            json_str = dietary_goals_response[start:end + 1]
-                            goals_data = json.loads(json_str)
+                            groq_client = GroqClient()
+                            dietary_goals_response = groq_client.generate_dietary_goals(
+                                age, sex, weight, height
+                            )
+                        except Exception as e:
+                            st.error(f"API call failed: {e}, proceeding with account creation.")
 
+                    if dietary_goals_response:
+                        goals_data = parse_json_object(dietary_goals_response)
+                        if goals_data is not None:
                             dietary_goals = f"Calories: {goals_data['calories']}, Fiber: {goals_data['fiber']}g, Protein: {goals_data['protein']}g"
                             st.success("✅ Dietary goals generated!")
                             st.info(f"**Your Goals:** {dietary_goals}")
                             if 'explanation' in goals_data:
                                 st.caption(f"ℹ️ {goals_data['explanation']}")
-
-                        except json.JSONDecodeError:
+                        else:
                             st.warning("⚠️ Could not parse response.")
-                            dietary_goals = "to be completed later"
-                    else:
-                        dietary_goals = "to be completed later"
 
-                dietary_restrictions = f"Restrictions: {restrictions}\nAllergies: {allergies}\nPreferences: {preferences}"
-                if create_user(username, password, age, sex, weight, height, dietary_restrictions, json.dumps(goals_data)):
+                if create_user(username, password, age, sex, weight, height,
+                               restrictions, allergies, preferences, goals_data):
                     st.session_state.account_created = True
+                    if goals_engine is not None:
+                        # Only explained once the account exists, a rejected name costs no LLM call
+                        st.session_state.goals_explanation_job = explain_goals_async(age, sex, weight, height, goals_data)
 
             except Exception as e:
                 st.error(f"❌ Error: {str(e)}")
@@ -211,6 +234,10 @@ def register_view():
     # After successful account creation
     if st.session_state.get("account_created"):
         st.success("🎉 Account created successfully! You can now log in.")
+        if st.session_state.get("goals_explanation"):
+            st.caption(f"ℹ️ {st.session_state.goals_explanation}")
+        elif st.session_state.get("goals_explanation_job"):
+            render_goals_explanation(st.session_state.goals_explanation_job)
         if st.button("🔐 Log In", use_container_width=True):
             navigate_to('login')
             st.rerun()